@@ -5,20 +5,331 @@
 # to management
    
 
+import argparse
+import concurrent.futures
+import contextlib
 import copy
 import csv
 import custtools.admintools as ad
-import custtools.datetools as da
 import custtools.filetools as ft
 import datetime as dt
+import hashlib
+import io
+import json
+import numpy as np
+import os
 import pandas as pd
 import re
+import shutil
+import sqlite3
 import sys
+import time
+
+
+# Days since a date after which a student falls into each tag zone
+TAG_THRESHOLDS = {'Orange': 55, 'Red': 83, 'Black': 139}
+# Colour tags from lowest to highest (Purple is handled separately)
+TAG_ORDER = ['Black', 'Red', 'Orange', 'Green']
+# Statuses for students that are no longer active
+RESERVED_TAGS = ['withdrawn', 'graduated', 'expired', 'suspended', 'on hold',
+                 'cancelled', 'transferred']
+# Status tags found in the Insightly Contact Tag List, in priority order
+STATUS_TAGS = ['suspended', 'withdrawn', 'graduated', 'expired', 'on hold',
+               'cancelled', 'green', 'orange', 'red', 'black', 'purple']
+# Lookahead so that overlapping tags (e.g. 'red' in 'expired') are all found
+TAG_MATCHER = re.compile('(?=({}))'.format('|'.join(
+        re.escape(tag) for tag in STATUS_TAGS + RESERVED_TAGS)))
+# Batch mode state: whether a batch is running, the file for each source, the
+# warnings logs kept for the job (None when they are processed directly) and
+# the job's number in the job file (None when not running a batch job)
+BATCH = {'running': False, 'files': {}, 'warnings': None, 'job': None}
+# Menu options whose batch jobs must wait for every job of the given options
+# to finish (the Tag History Report reads what Insightly Tags Updates saves)
+BATCH_DEPENDENCIES = {18: (17,)}
+# Directory holding loaded and checked source files, and its maximum size
+INPUT_CACHE_DIR = '.input_cache'
+INPUT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+# Version of the input cache entries, changed when the way they are saved
+# changes
+INPUT_CACHE_FORMAT = 2
+# Data loaded this session, keyed on (source, file path, modified time). The
+# DataFrames are shared by every report so they must not be changed in place
+SESSION_DATA = {}
+# Column names and categorical columns of the data from each source
+SCHEMAS = {
+    'Active_Students_File_': (['Student ID', 'Student', 'Course'],
+                              ['Course']),
+    'Addresses_': (['Student ID', 'Number', 'Street', 'Suburb', 'City',
+                    'Postcode', 'Country'], ['City', 'Country']),
+    'Count_Completions_Report_': (['Course', 'Tutor', 'Completions'],
+                                  ['Course', 'Tutor']),
+    'Count_Students_Tutors_Report_': (['Course', 'Tutor', 'Number Students'],
+                                      ['Course', 'Tutor']),
+    'Count_Unmarked_Assess_Report_': (['Course', 'Tutor',
+                                       'Number assessments'],
+                                      ['Course', 'Tutor']),
+    'Expiry_Report_': (['Student ID', 'Student', 'Email', 'Course',
+                        'Expiry Date'], ['Course']),
+    'Insightly Tag Data': (['StudentID', 'First Name', 'Last Name', 'Tag'],
+                           []),
+    'Last_Login_': (['Student ID', 'Student', 'Tutor', 'Course',
+                     'Last Access', 'Email'], ['Tutor', 'Course']),
+    'Last Quiz Data': (['StudentID', 'Student', 'Course', 'Last quiz date'],
+                       []),
+    'Last Submission Data': (['StudentID', 'Student', 'Course', 'Tutor',
+                              'Last submission date'], []),
+    'Never_Logged_In_': (['Student ID', 'Student', 'Tutor', 'Course',
+                          'Account Created', 'Report Date', 'Email'],
+                         ['Tutor', 'Course']),
+    'Not_Logged_In_': (['Student ID', 'Student', 'Tutor', 'Course',
+                        'Last Access', 'Email'], ['Tutor', 'Course']),
+    'Previous Tag Data': (['StudentID', 'EnrolmentID', 'Student',
+                           'Course ID', 'Tutor', 'Updated_Tags'], []),
+    'Student Database Tags': (['EnrolmentID', 'StudentID', 'First Name',
+                               'Last Name', 'Course ID', 'Tutor ID', 'Status',
+                               'Tag', 'Start Date'], []),
+    'Students_File_': (['Course', 'Tutor', 'Student ID', 'Student'],
+                       ['Course', 'Tutor']),
+    'Submissions_Made_': (['Student ID', 'Student', 'Course', 'Tutor',
+                           'Assignment name', 'Last submission date'],
+                          ['Course', 'Tutor']),
+    'Tutor_IDs_': (['Tutor ID', 'First Name', 'Last Name'], []),
+    'User_Completions_Mark_Report_': (['Course', 'Tutor group', 'Student ID',
+                                       'Student', 'Tutor', 'Head Tutor',
+                                       'Manager'],
+                                      ['Course', 'Tutor group']),
+    'User_Mark_Tutor_Only_': (['Course', 'Tutor group', 'Student ID',
+                               'Student', 'Tutor', 'Head Tutor', 'Manager'],
+                              ['Course', 'Tutor group'])
+    }
+# Checks made on the data from each source (see validate_data()): name for the
+# error log, heading for the warnings and a (column, severity, key column,
+# message) check for each required column. A required column that is empty
+# is an 'error' (saved to the error log) or a 'warning', with the message
+# formatted with the row's key column. Columns not listed are optional
+COLUMN_CHECKS = {
+    'Active_Students_File_': (
+        'Students File', '\nActive Students File Warnings:\n',
+        [('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}'),
+         ('Course', 'warning', 'Student ID',
+          'Course is missing for student with Student ID {}')]),
+    'Addresses_': (
+        'Addresses Data File', '\nAddresses Data File Warnings:\n',
+        [('Number', 'warning', 'Student ID',
+          'Address Number is missing for student with the Student ID {}'),
+         ('Street', 'warning', 'Student ID',
+          'Address Street is missing for student with the Student ID {}'),
+         ('Suburb', 'warning', 'Student ID',
+          'Address Suburb is missing for student with the Student ID {}'),
+         ('City', 'warning', 'Student ID',
+          'Address City is missing for student with the Student ID {}'),
+         ('Postcode', 'warning', 'Student ID',
+          'Address Postcode is missing for student with the Student ID {}'),
+         ('Country', 'warning', 'Student ID',
+          'Address Country is missing for student with the Student ID {}')]),
+    'Count_Completions_Report_': (
+        'Count Completion Report',
+        '\nCount of completions by tutor and group Report Warnings:\n',
+        [('Tutor', 'warning', 'Course', 'Tutor group is missing for an entry'),
+         ('Completions', 'warning', 'Course',
+          'Completions missing for an entry')]),
+    'Count_Students_Tutors_Report_': (
+        'Count Students Tutor Groups Report',
+        '\nCount of students per tutor groups Report Warnings:\n',
+        [('Tutor', 'warning', 'Course', 'Tutor group is missing for an entry'),
+         ('Number Students', 'warning', 'Course',
+          'Number students missing for an entry')]),
+    'Count_Unmarked_Assess_Report_': (
+        'Count Unmarked Assessments Report',
+        '\nCount of unmarked assessments Report Warnings:\n',
+        [('Tutor', 'warning', 'Course', 'Tutor group is missing for an entry'),
+         ('Number assessments', 'warning', 'Course',
+          'Number assessments missing for an entry')]),
+    'Expiry_Report_': (
+        'Expiry Report', '\nExpiry Report Warnings:\n',
+        [('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}'),
+         ('Email', 'warning', 'Student ID',
+          'Email is missing for student with Student ID {}'),
+         ('Course', 'warning', 'Student ID',
+          'Course is missing for student with Student ID {}'),
+         ('Expiry Date', 'error', 'Student ID',
+          'Expiry is missing for student with Student ID {}')]),
+    'Insightly Tag Data': (
+        'Insightly Data File', '\nInsightly Data File Warnings:\n',
+        [('First Name', 'error', 'StudentID',
+          'First Name is missing for student with the Student ID {}'),
+         ('Last Name', 'error', 'StudentID',
+          'Last Name is missing for student with the Student ID {}'),
+         ('Tag', 'warning', 'StudentID',
+          'Tags is missing for student with the Student ID {}')]),
+    'Last_Login_': (
+        'Last Login Date Report', '\nLast Login Date Report Warnings:\n',
+        [('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}'),
+         ('Tutor', 'warning', 'Student ID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Course', 'warning', 'Student ID',
+          'Course is missing for student with Student ID {}'),
+         ('Last Access', 'warning', 'Student ID',
+          'Last Access is missing for student with Student ID {}'),
+         ('Email', 'warning', 'Student ID',
+          'Email is missing for student with Student ID {}')]),
+    'Last Quiz Data': (
+        'Last_quiz_date_', '\nLast Quiz Date Report Warnings:\n',
+        [('Student', 'warning', 'StudentID',
+          'Name is missing for student with Student ID {}'),
+         ('Course', 'warning', 'StudentID',
+          'Course is missing for student with Student ID {}'),
+         ('Last quiz date', 'warning', 'StudentID',
+          'Last quiz date is missing for student with Student ID {}')]),
+    'Last Submission Data': (
+        'Last_submissions_date_',
+        '\nLast Submission Date Report Warnings:\n',
+        [('Student', 'warning', 'StudentID',
+          'Name is missing for student with Student ID {}'),
+         ('Course', 'warning', 'StudentID',
+          'Course is missing for student with Student ID {}'),
+         ('Tutor', 'warning', 'StudentID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Last submission date', 'warning', 'StudentID',
+          'Last submission date is missing for student with Student ID {}')]),
+    'Never_Logged_In_': (
+        'Never Logged In Report', '\nNever Logged In Report Warnings:\n',
+        [('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}'),
+         ('Tutor', 'warning', 'Student ID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Course', 'warning', 'Student ID',
+          'Course is missing for student with Student ID {}'),
+         ('Account Created', 'error', 'Student ID',
+          'Account Created is missing for student with Student ID {}'),
+         ('Report Date', 'error', 'Student ID',
+          'Report Date is missing for student with Student ID {}'),
+         ('Email', 'warning', 'Student ID',
+          'Email is missing for student with Student ID {}')]),
+    'Not_Logged_In_': (
+        'Not Logged In Report', '\nNot Logged In Report Warnings:\n',
+        [('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}'),
+         ('Tutor', 'warning', 'Student ID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Course', 'warning', 'Student ID',
+          'Course is missing for student with Student ID {}'),
+         ('Last Access', 'warning', 'Student ID',
+          'Last Access is missing for student with Student ID {}'),
+         ('Email', 'warning', 'Student ID',
+          'Email is missing for student with Student ID {}')]),
+    'Previous Tag Data': (
+        'Previous Months Tags data', '\nPrevious Months Tags Warnings:\n',
+        [('EnrolmentID', 'error', 'StudentID',
+          'Enrolment ID is missing for student with Student ID {}'),
+         ('Student', 'warning', 'StudentID',
+          'Name is missing for student with Student ID {}'),
+         ('Course ID', 'warning', 'StudentID',
+          'Course is missing for student with Student ID {}'),
+         ('Tutor', 'warning', 'StudentID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Updated_Tags', 'error', 'StudentID',
+          'Tag is missing for student with Student ID {}')]),
+    'Student Database Tags': (
+        'Enrolment Tags Report', '\nEnrolment Tags Report Warnings:\n',
+        [('StudentID', 'error', 'EnrolmentID',
+          'Student ID is missing for student with the enrolment ID {}.'),
+         ('First Name', 'warning', 'StudentID',
+          'First Name is missing for student with the Student ID {}'),
+         ('Last Name', 'warning', 'StudentID',
+          'Last Name is missing for student with the Student ID {}'),
+         ('Course ID', 'warning', 'StudentID',
+          'Course Code is missing for student with the Student ID {}'),
+         ('Status', 'warning', 'StudentID',
+          'Status is missing for student with the Student ID {}'),
+         ('Tag', 'error', 'StudentID',
+          'Tag is missing for student with the Student ID {}'),
+         ('Start Date', 'error', 'StudentID',
+          'Start Date is missing for student with the Student ID {}')]),
+    'Students_File_': (
+        'Students File', '\nStudent File Warnings:\n',
+        [('Tutor', 'warning', 'Student ID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Student ID', 'warning', 'Student',
+          'Student ID is missing for student with Student Name {}'),
+         ('Student', 'warning', 'Student ID',
+          'Student Name is missing for student with Student ID {}')]),
+    'Submissions_Made_': (
+        'Submissions_Made_', '\nSubmissions Made Report Warnings:\n',
+        [('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}'),
+         ('Course', 'warning', 'Student ID',
+          'Course is missing for student with Student ID {}'),
+         ('Tutor', 'warning', 'Student ID',
+          'Tutor is missing for student with Student ID {}'),
+         ('Assignment name', 'warning', 'Student ID',
+          'Assignment name is missing for student with Student ID {}'),
+         ('Last submission date', 'error', 'Student ID',
+          'Last submission date is missing for student with Student ID {}')]),
+    'Tutor_IDs_': (
+        'Tutor_ID_Numbers', '\nTutor File Warnings:\n',
+        [('First Name', 'warning', 'Tutor ID',
+          'First Name for tutor with Tutor ID Number {} is missing.'),
+         ('Last Name', 'warning', 'Tutor ID',
+          'Last Name for tutor with Tutor ID Number {} is missing.')]),
+    'User_Completions_Mark_Report_': (
+        'User Completion Mark Report',
+        '\nUser completion mark Report Warnings:\n',
+        [('Tutor group', 'warning', 'Student ID',
+          'Tutor group is missing for student with Student ID {}'),
+         ('Student ID', 'warning', 'Student',
+          'Student ID is missing for student with Name {}'),
+         ('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}')]),
+    'User_Mark_Tutor_Only_': (
+        'Users marked by tutor only Report',
+        '\nUsers marked complete tutor only Report Warnings:\n',
+        [('Tutor group', 'warning', 'Student ID',
+          'Tutor group is missing for student with Student ID {}'),
+         ('Student ID', 'warning', 'Student',
+          'Student ID is missing for student with Name {}'),
+         ('Student', 'warning', 'Student ID',
+          'Name is missing for student with Student ID {}')])
+    }
+# Course names for students contain a course code, e.g. 'Name (XXX-PT-XXX)'
+STUDENT_COURSE = re.compile(r'.+\(.+-.+-.+\)')
+PT_COURSE = re.compile(r'.+\(.+-PT-.+\)')
+ON_COURSE = re.compile(r'.+\(.+-ON-.+\)')
+# Delivery modes given by get_courses()
+COURSE_MODES = ['PT', 'ON', 'Other', 'Non-student']
+# Course code and mode for each course name seen, shared by all reports
+COURSE_CACHE = {}
+# Periods covered by the Expiry reports, measured from today
+EXPIRY_PERIODS = {'10_Days_': pd.DateOffset(days=10),
+                  '1_Month_': pd.DateOffset(months=1),
+                  '3_Months_': pd.DateOffset(months=3)}
+# Date formats recognised by normalise_dates(), checked in order
+DATE_FORMATS = [(re.compile(r'^\d{4}-\d{1,2}-\d{1,2}$'), '%Y-%m-%d'),
+                (re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$'), '%d/%m/%Y'),
+                (re.compile(r'^\d{1,2}-\d{1,2}-\d{4}$'), '%d-%m-%Y'),
+                (re.compile(r'^\d{4}/\d{1,2}/\d{1,2}$'), '%Y/%m/%d')]
+# Date given by the Learning Platform when there is no date
+NIL_DATE = pd.Timestamp(1970, 1, 1)
+# Parsed dates for the current report, keyed by (format, date string). Cleared
+# with DATE_STATS by clear_date_cache() before each report is run
+DATE_CACHE = {}
+# Dates read and parsed for the current report
+DATE_STATS = {'rows': 0, 'distinct': 0, 'parsed': 0}
+# Store of the Updated_Tags from every Insightly Tags run
+TAG_HISTORY_DB = 'Tag_History.db'
+TAG_HISTORY_HEADINGS = ['StudentID', 'EnrolmentID', 'Student', 'Course',
+                        'Tutor', 'Updated_Tags']
 
 
 def add_eid(tags_df, sd_df, sid_name, eid_name, tag_name):
     """Return DataFrame with Enrolment Code added to each student.
     
+    The Enrolment Code is taken from the first entry for the student in sd_df.
+    Students that do not appear in sd_df are dropped and returned in a list.
+    
     Args:
         tags_df (DataFrame): Student ID, Tag.
         sd_df (DataFrame): eid_name, sid_name, fname_name, lname_name,
@@ -29,31 +340,15 @@ def add_eid(tags_df, sd_df, sid_name, eid_name, tag_name):
     
     Returns:
         updated_tags (DataFrame): tags_df with the Enrolment Code added.
+        unmatched (list): Student IDs that were not found in sd_df.
     """
-    students = []
     print('\nAdding Enrolment ID\'s')
     headings = [sid_name, eid_name, tag_name]
-    num_students = len(tags_df) # For calculating % complete
-    n = 0
-    for index, row in tags_df.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        student = []
-        # Get Student ID
-        studentID = row[sid_name]
-        student.append(studentID)
-        # Find student in sd_data
-        for index_s, row_s in sd_df.iterrows():
-            if row_s[sid_name] == studentID:
-                student.append(row_s[eid_name])
-                student.append(row[tag_name])
-                students.append(student)
-                break
-    updated_tags = pd.DataFrame(data = students, columns = headings)
+    updated_tags, unmatched = merge_first_match(tags_df[[sid_name, tag_name]],
+                                                sd_df, sid_name, [eid_name])
+    updated_tags = updated_tags[headings].reset_index(drop=True)
     print('\rFinished adding Enrolment ID\'s')
-    return updated_tags
+    return updated_tags, unmatched
 
 
 def add_inactive(updated_tags, sd_df, sid_name, tag_name, sid_loc = 0):
@@ -72,48 +367,29 @@ def add_inactive(updated_tags, sd_df, sid_name, tag_name, sid_loc = 0):
     Returns:
         all_tags (list): updated_tags with inactive students added back.
     """
-    all_tags = copy.deepcopy(updated_tags)
     print('\nAdding Inactive Students')
-    for student in all_tags:
-    # Get list of Student IDs in updated_tags
-        existing_students = get_students_list(updated_tags, 0)
-    # Add students not currently in existing_students
-    num_students = len(sd_df) # For calculating % complete
-    n = 0
-    for index, row in sd_df.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if row[sid_name] not in existing_students:
-            student = [row[sid_name], row[tag_name]] # Add Student ID, Tag
-            all_tags.append(student)
+    # Get set of Student IDs in updated_tags
+    existing_students = set(get_students_list(updated_tags, sid_loc))
+    # Add students not currently in existing_students (Student ID, Tag)
+    inactive = ~sd_df[sid_name].isin(existing_students)
+    all_tags = updated_tags + sd_df.loc[inactive, [sid_name, tag_name]
+                                        ].values.tolist()
     print('\rFinished adding Inactive Students')
     return all_tags
 
 
-def add_missing(lsd, sd, tutors, missing, fname, lname, tid_name, sid_name,
-                c_name):
+def add_missing(lsd, s_index, missing):
     """Add details of students missing from lsd_tags.
     
     Extracts and generates the required information for each student in
     missing so that they can be added to the lsd_tags data.
-    First and Last name is combined from the Student Database data. Course is
-    taken from the Student Database data. Tutor First and Last name is taken
-    from the tutors data.
-    
-    # To Do: Send column names in a list and then get from list position
+    First and Last name, Course and Tutor name are taken from the student
+    index built from the Student Database and tutors data.
     
     Args:
         lsd (list): List of Student IDs, Name, Course Code, Tutor Name, Tag.
-        sd (DataFrame): Student Database data.
-        tutors (DataFrame): Tutor ID, First Name, Last Name.
+        s_index (dict): Student details from get_student_index().
         missing (list): Student ID of students not in lsd.
-        fname (str): Column name for First Name.
-        lname (str): Column name for Last Name.
-        tid_name (str): Column name for Tutor ID.
-        sid_name (str): Column name for Student ID.
-        c_name (str): column name for Course
     
     Returns:
         updated_lsd (list): List with previous lsd data and missing students
@@ -132,12 +408,11 @@ def add_missing(lsd, sd, tutors, missing, fname, lname, tid_name, sid_name,
         # Add Student ID
         new_student.append(student)
         # Add Name
-        new_student.append(get_s_name(student, sd, fname, lname, sid_name))
+        new_student.append(get_s_name(student, s_index))
         # Add Course Code
-        new_student.append(get_s_course(student, sd, sid_name, c_name))
+        new_student.append(get_s_course(student, s_index))
         # Add Tutor's name
-        new_student.append(get_t_name(student, sd, tutors, fname, lname,
-                                      tid_name, sid_name))
+        new_student.append(get_t_name(student, s_index))
         # Add Black tag
         new_student.append('Black')
         updated_lsd.append(new_student)
@@ -150,7 +425,9 @@ def add_missing(lsd, sd, tutors, missing, fname, lname, tid_name, sid_name,
 def add_stud(tags_df, sd_df, headings_t, headings_s):
     """Return DataFrame with Student details added.
     
-    Adds Student Name, Course, Tutor Name to the tags_df DataFrame.
+    Adds Student Name, Course, Tutor Name to the tags_df DataFrame. Details are
+    taken from the first entry for the student in sd_df. Students that do not
+    appear in sd_df are dropped and returned in a list.
     
     Args:
       tags_df (DataFrame): sid_name, eid_name, stud_name, course_name,
@@ -162,65 +439,55 @@ def add_stud(tags_df, sd_df, headings_t, headings_s):
     
     Returns:
         updated_tags (DataFrame): tags_df with Student details added.
+        unmatched (list): Student IDs that were not found in sd_df.
     """
-    students = []
     print('\nAdding Student Details')
-    num_students = len(tags_df) # For calculating % complete
-    n = 0
-    for index, row in tags_df.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        student = []
-        # Get Student ID
-        studentID = row[headings_t[0]]
-        student.append(studentID)
-        student.append(row[headings_t[1]])
-        # Find student in sd_df
-        for index_sd, row_sd in sd_df.iterrows():
-            if row_sd[headings_s[1]] == studentID:
-                name = '{} {}'.format(row_sd[headings_s[2]],
-                        row_sd[headings_s[3]])
-                student.append(name)
-                student.append(row_sd[headings_s[4]])
-                student.append(row_sd[headings_s[5]])
-                student.append(row[headings_t[5]])
-                students.append(student)
-                break
+    students = tags_df[[headings_t[0], headings_t[1], headings_t[5]]]
+    updated_tags, unmatched = merge_first_match(students, sd_df, headings_t[0],
+                                                headings_s[2:6])
+    # Combine First and Last name
+    updated_tags[headings_t[2]] = (updated_tags[headings_s[2]].astype(str) +
+                ' ' + updated_tags[headings_s[3]].astype(str))
     headings = [headings_t[0], headings_t[1], headings_t[2], headings_s[4],
                 headings_s[5], headings_t[5]]
-    updated_tags = pd.DataFrame(data = students, columns = headings)
+    updated_tags = updated_tags[headings].reset_index(drop=True)
     print('\rFinished adding Student Details')
-    return updated_tags
+    return updated_tags, unmatched
 
 
-def add_tutor(student_ids, sd_df, tutors, fname, lname, tid_name, sid_name):
+def add_total_row(data, label_col):
+    """Return DataFrame with a Total row added.
+    
+    Sums each numeric column and adds the totals as a new row at the end of
+    the data, with 'Total' in label_col.
+    
+    Args:
+        data (DataFrame): Data to be totalled.
+        label_col (str): Name of the column to hold the 'Total' label.
+    
+    Returns:
+        totalled (DataFrame): data with the Total row added.
+    """
+    totals = data.sum(numeric_only=True).to_frame().T
+    totals[label_col] = 'Total'
+    totalled = pd.concat([data, totals], ignore_index=True)[data.columns]
+    return totalled
+
+
+def add_tutor(student_ids, s_index):
     """Return Tutor name for each student.
     
     Args:
         student_ids (list): Student IDs
-        sd (DataFrame): Student Database data.
-        tutors (DataFrame): Tutors ID, First name and Last name.
-        fname (str): Column name for First Name.
-        lname (str): Column name for Last Name.
-        tid_name (str): Column name for Tutor ID.
-        sid_name (str): Column name for Student ID.
+        s_index (dict): Student details from get_student_index().
     
     Returns:
         updated_students (list): Each student with their tutor name.
     """
     updated_students = []
     print('\nAdding Tutor Details')
-    num_students = len(student_ids) # For calculating % complete
-    n = 0
     for student in student_ids:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        tutor = get_t_name(student, sd_df, tutors, fname, lname, tid_name,
-                           sid_name)
+        tutor = get_t_name(student, s_index)
         updated_student = [student, tutor]
         updated_students.append(updated_student)
     print('\rFinished adding Tutor Details')
@@ -261,917 +528,60 @@ def add_tutor_df(tags_df, tags_df_students, headings, sid_loc=0, t_loc=1):
                 break
         student.append(row[headings[3]])        
         students.append(student)
-    updated_tags_df = pd.DataFrame(data = students, columns = headings)
-    print('\rFinished adding Tutor Name')
-    return updated_tags_df
-
-
-def check_active_students(report_data):
-    """Return list of warnings for information in Active Students file.
-
-    Checks the Active Students file data to see if the required information is
-    present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Active Students File data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        Student ID, Student, Course
-    
-    File Source (report_data):
-        Active students in a course
-    """
-    errors = []
-    warnings = ['\nActive Students File Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Students File')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_add(address_data):
-    """Return list of warnings for information in Addresses data file.
-    
-    Checks the Addresses data to see if the required information is present.
-    Missing or incorrect information that is non-fatal is appended to a
-    warnings list and returned.
-    
-    Args:
-        address_data (list): Address data for all students in database.
-        
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-    
-    File Structure (Addresses):
-        StudentPK, AddressNumber, AddressStreet, AddressSuburb, AddressCity,
-        AddressPostcode, AddressCountry
-        
-    File Source (Addresses):
-        Student Database (Students Table)
-    """
-    errors = []
-    warnings = ['\nAddresses Data File Warnings:'
-                '\n']
-    for student in address_data:
-        if student[1] in (None, ''):
-            warnings.append('Address Number is missing for student with the '
-                            'Student ID {}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Address Street is missing for student with the '
-                            'Student ID {}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Address Suburb is missing for student with the '
-                            'Student ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            warnings.append('Address City is missing for student with the '
-                            'Student ID {}'.format(student[0]))
-        if student[5] in (None, ''):
-            warnings.append('Address Postcode is missing for student with the '
-                            'Student ID {}'.format(student[0]))
-        if student[6] in (None, ''):
-            warnings.append('Address Country is missing for student with the '
-                            'Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Adresses Data File')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_ccr(report_data):
-    """Return list of warnings for information in Count completion report file.
-
-    Checks the Count completion by tutor and group in courses report data to
-    see if the required information is present. Missing or incorrect
-    information that is non-fatal is appended to a warnings list and returned.
-
-    Args:
-        report_data (list): Count completion by tutor and group in courses
-        report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        Course, Tutor, Completions
-
-    File Source (report_data):
-        Count of completions by tutor and group in courses
-    """
-    errors = []
-    warnings = ['\nCount of completions by tutor and group Report Warnings:'
-                '\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Tutor group is missing for an entry')
-        if student[2] in (None, ''):
-            warnings.append('Completions missing for an entry')
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Count Completion Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_cst(report_data):
-    """Return warnings for information in Count students per tutor report file.
-
-    Checks the Count of students per tutor group report data to see if the
-    required information is present. Missing or incorrect information that is
-    non-fatal is appended to a warnings list and returned.
-
-    Args:
-        report_data (list): Count of students per tutor group report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        Course, Tutor Group, Number Students
-
-    File Source (report_data):
-        Count of students per tutor groups
-    """
-    errors = []
-    warnings = ['\nCount of students per tutor groups Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Tutor group is missing for an entry')
-        if student[2] in (None, ''):
-            warnings.append('Number students missing for an entry')
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Count Students Tutor Groups Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_expiry_report(report_data):
-    """Return list of warnings for information in Expiry report file.
-
-    Checks the Expiry report data to see if the required information is
-    present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Expiry report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Email, Course, Expiry date
-        
-    File Source (report_data):
-        Students expiring X months
-    """
-    errors = []
-    warnings = ['\nExpiry Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Email is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            errors.append('Expiry is missing for student with '
-                            'Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Expiry Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_insightly(report_data):
-    """Return list of warnings for information in Insightly data.
-
-    Checks the Insightly data to see if the required information is present.
-    Missing or incorrect information that is non-fatal is appended to a
-    warnings list and returned.
-
-    Args:
-        report_data (list): Insightly report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File structure (report_data):
-        StudentID, First Name, Last Name, Tags.
-
-    File source (report_data):
-        Insightly Data Dump (using columns listed in File structure).
-    """
-    errors = []
-    warnings = ['\nInsightly Data File Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            errors.append('First Name is missing for student with the '
-                          'Student ID {}'.format(student[0]))
-        if student[2] in (None, ''):
-            errors.append('Last Name is missing for student with the '
-                          'Student ID {}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Tags is missing for student with the '
-                          'Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Insightly Data File')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_last_login(report_data):
-    """Return list of warnings for information in Last Login Date report file.
-
-    Checks the Last Login Date report data to see if the required information
-    is present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Last Login Date report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Tutor, Course, Last Access, Email
-    
-    File Source (report_data):
-        Last Login Date
-    """
-    errors = []
-    warnings = ['\nLast Login Date Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Tutor is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            warnings.append('Last Access is missing for student with '
-                            'Student ID {}'.format(student[0]))
-        if student[5] in (None, ''):
-            warnings.append('Email is missing for student with Student '
-                            'ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Last Login Date Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_last_quiz_data(report_data):
-    """Return list of warnings for information in Last Quiz Made data.
-
-    Checks the Last Quiz Made report data to see if the required 
-    information is present. Missing or incorrect information that is non-fatal
-    is appended to a warnings list and returned.
-
-    Args:
-        report_data (list): Last Quiz Date report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Course, Quiz Start
-        
-    File Source (report_data):
-        Last quiz data (all courses)
-    """
-    errors = []
-    warnings = ['\nLast Quiz Date Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Last quiz date is missing for student '
-                            'with Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Last_qiuz_date_')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_last_sub_data(report_data):
-    """Return list of warnings for information in Last Submission Made data.
-
-    Checks the Last Submission Made report data to see if the required 
-    information is present. Missing or incorrect information that is non-fatal
-    is appended to a warnings list and returned.
-
-    Args:
-        report_data (list): Last Submissions Date report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Course, Tutor, Last submission date
-        
-    File Source (report_data):
-        Last submission data (all courses)
-    """
-    errors = []
-    warnings = ['\nLast Submission Date Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Tutor is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[4] in (None, ''):
-            warnings.append('Last submission date is missing for student '
-                            'with Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Last_submissions_date_')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_never_logged_in(report_data):
-    """Return list of warnings for information in Never Logged In report file.
-
-    Checks the Never Logged In report data to see if the required information
-    is present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Never Logged In report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Tutor, Course, Account Created, Report Date, Email
-    
-    File Source (report_data):
-        Students never logged in
-    """
-    errors = []
-    warnings = ['\nNever Logged In Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Tutor is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            errors.append('Account Created is missing for student with '
-                            'Student ID {}'.format(student[0]))
-        if student[5] in (None, ''):
-            errors.append('Report Date is missing for student with '
-                            'Student ID {}'.format(student[0]))
-        if student[6] in (None, ''):
-            warnings.append('Email is missing for student with '
-                            'Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Never Logged In Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_not_logged_in(report_data):
-    """Return list of warnings for information in Not Logged In report file.
-
-    Checks the Not Logged In report data to see if the required infornation
-    is present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Not Logged In report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Tutor, Course, Last Access, Email
-    
-    File Source (report_data):
-        Students have not logged in last X weeks
-    """
-    errors = []
-    warnings = ['\nNot Logged In Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Tutor is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            warnings.append('Last Access is missing for student with '
-                            'Student ID {}'.format(student[0]))
-        if student[5] in (None, ''):
-            warnings.append('Email is missing for student with '
-                            'Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Not Logged In Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_prev_data(read_data):
-    """Return list of warnings for information in Previous Months Tags file.
-
-    Checks the Previous Months Tags data to see if the required infornation
-    is present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        read_data (list): Previous Months Tags data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (read_data):
-        StudentID, EnrolmentID, Student, Course, Tutor, Updated_Tags
-    
-    File Source (read_data):
-        Previous Months Updated Tags File.
-    """
-    errors = []
-    warnings = ['\nPrevious Months Tags Warnings:\n']
-    for student in read_data:
-        if student[1] in (None, ''):
-            errors.append('Enrolment ID is missing for student with '
-                          'Student ID {}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            warnings.append('Tutor is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[5] in (None, ''):
-            errors.append('Tag is missing for student with Student ID '
-                            '{}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Previous Months Tags data')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_review_warnings():
-    """Return True or False for reviewing warning messages.
-
-    Returns:
-        True if user wants to review warning messages, False otherwise.
-    """
-    review = ''
-    while review == '':
-        review = input('\nDo you want to view the warning messages? y/n --> ')
-        if review not in ('y', 'n'):
-            print('\nThat is not a valid answer! Please try again.')
-            review = ''
-        elif review == 'y':
-            return True
-        else:
-            return False
-
-
-def check_students_file(report_data):
-    """Return list of warnings for information in Students file.
-
-    Checks the Students file data to see if the required information is
-    present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Students File data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        Course, Tutor, Student ID, Student
-    
-    File Source (report_data):
-        Students in tutor group
-    """
-    errors = []
-    warnings = ['\nStudent File Warnings:\n']
-    for student in report_data:
-        for item in student:
-            if item[1] in (None, ''):
-                warnings.append('Tutor is missing for student with Student ID '
-                                '{}'.format(item[2]))
-            if item[2] in (None, ''):
-                warnings.append('Student ID is missing for student with Student '
-                                'Name {}}'.format(item[3]))
-            if item[3] in (None, ''):
-                warnings.append('Student Name is missing for student with '
-                                'Student ID {}'.format(item[2]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Students File')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_subs_made(report_data, period):
-    """Return list of warnings for information in Submissions Made report file.
-
-    Checks the Submissions Made report data to see if the required information
-    is present. Missing or incorrect information that is non-fatal is appended
-    to a warnings list and returned.
-
-    Args:
-        report_data (list): Submissions Made report data.
-        period (str): The period the data covers.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        StudentID, Student, Course, Tutor, Assignment name,
-        Last submission date
-        
-    File Source (report_data):
-        Students submitted work in previous X weeks
-    """
-    errors = []
-    warnings = ['\nSubmissions Made Report Warnings:\n']
-    for student in report_data:               
-        if student[1] in (None, ''):
-            warnings.append('Name is missing for student with Student ID '
-                            '{}'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('Course is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[3] in (None, ''):
-            warnings.append('Tutor is missing for student with Student '
-                            'ID {}'.format(student[0]))
-        if student[4] in (None, ''):
-            warnings.append('Assignment name is missing for student with '
-                            'Student ID {}'.format(student[0]))
-        if student[5] in (None, ''):
-            errors.append('Last submission date is missing for student '
-                            'with Student ID {}'.format(student[0]))
-    # Check if any errors have been identified, save error log if they have
-    name = 'Submissions_Made_{}'.format(period)
-    if len(errors) > 0:
-        ft.process_error_log(errors, name)
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_tags_data(report_data):
-    """Return warnings for information in Enrolment Tags data file.
-
-    Checks the Enrolment Tags report data to see if the required information is
-    present. Missing or incorrect information that is non-fatal is appended to
-    a warnings list and returned.
-    
-    Args:
-         report_data (list): Enrolment Tags report data.
-         
-    File Structure (report_data):
-        EnrolmentPK, StudentID, NameGiven, NameSurname, CourseFK, TutorFK,
-        Status, Tag, StartDate.
-        
-    File Source (report_data):
-        qryEnrolmentTags query from Student Database.
-    """
-    errors = []
-    warnings = ['\nEnrolment Tags Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            errors.append('Student ID is missing for student with the '
-                            'enrolment ID {}.'.format(student[0]))
-        if student[2] in (None, ''):
-            warnings.append('First Name is missing for student with the '
-                            'Student ID {}'.format(student[1]))
-        if student[3] in (None, ''):
-            warnings.append('Last Name is missing for student with the '
-                            'Student ID {}'.format(student[1]))
-        if student[4] in (None, ''):
-            warnings.append('Course Code is missing for student with the '
-                            'Student ID {}'.format(student[1]))
-        if student[6] in (None, ''):
-            warnings.append('Status is missing for student with the Student '
-                            'ID {}'.format(student[1]))
-        if student[7] in (None, ''):
-            errors.append('Tag is missing for student with the Student ID '
-                            '{}'.format(student[1]))
-        if student[8] in (None, ''):
-            errors.append('Start Date is missing for student with the Student '
-                          'ID {}'.format(student[1]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Enrolment Tags Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_tu(tu_data):
-    """Return list of warnings for information in Tutor_IDs.csv file.
-
-    Checks the Tutor ID list data for the required information.
-    Required information that is missing causes an error file to be saved
-    and the program to exit.
-    Missing or incorrect information that is non-fatal is appended to a
-    warnings list and returned.
-
-    Args:
-        tu_data (list): A list with the ID number and name for each tutor.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File structure (tu_data):
-        TutorID, First Name, Last Name.
-    """
-    i = 0
-    errors = []
-    warnings = ['\nTutor File Warnings:\n']
-    while i < len(tu_data):
-        tutor = extract_tutor(tu_data, i)
-        # print('check_tu Tutor: ' + str(tutor))
-        if tutor[0] in (None, ''):
-            continue
-        if len(tutor[0].strip()) != 6:
-            errors.append('Tutor ID number is not the required length '
-                          'for tutor in position {} in the list.'.format
-                          (i))
-        if tutor[1] in (None, ''):
-            warnings.append('First Name for tutor with Tutor ID Number {} is '
-                            'missing.'.format(tutor[0]))
-        if tutor[2] in (None, ''):
-            warnings.append('Last Name for tutor with Tutor ID Number {} is '
-                            'missing.'.format(tutor[0]))
-        i += 1
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Tutor_ID_Numbers')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_tutor_ids(tutors, students):
-    """Check Tutor IDs in student data are in Tutor ID list.
-    
-    Checks that the Tutor ID for each student is contained in the list of valid
-    Tutor IDs. If invalid Tutor IDs are found they students concerned are
-    printed to the screen, an error file is created and the program exits.
-    
-    Args:
-        tutors (list): List of valid Tutor IDs.
-        students (list): List of lists of data for each student.
-    """
-    errors = []
-    for student in students:
-        if student[5] not in tutors:
-            errors.append('Tutor ID {} appears for the Student with the '
-                          'Student ID number of {}. This Tutor ID does not '
-                          'appear in the list of valid Tutor IDs.'.format(
-                                  student[5], student[1]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Tutor_ID_Numbers')
-
-
-def check_ua(report_data):
-    """Return warnings for information in Count unmarked assess report file.
-
-    Checks the Count of unmarked assessments by tutor report data to see if the
-    required information is present. Missing or incorrect information that is
-    non-fatal is appended to a warnings list and returned.
-
-    Args:
-        report_data (list): Count of unmarked assessments by tutor report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        Course, Tutor, Number assessments
-
-    File Source (report_data):
-        Count of unmarked assessments by tutor
-    """
-    errors = []
-    warnings = ['\nCount of unmarked assessments Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Tutor group is missing for an entry')
-        if student[2] in (None, ''):
-            warnings.append('Number students missing for an entry')
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'Count Unmarked Assessments Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
-
-
-def check_ucm(report_data):
-    """Return list of warnings for information in User completion report file.
-
-    Checks the User completion mark by course and group report data to see if
-    the required information is present. Missing or incorrect information that
-    is non-fatal is appended to a warnings list and returned.
-
-    Args:
-        report_data (list): User completion mark by course and group report
-        data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (report_data):
-        Course, Tutor group, Student ID, Student, Tutor, Head Tutor, Manager
+    updated_tags_df = pd.DataFrame(data = students, columns = headings)
+    print('\rFinished adding Tutor Name')
+    return updated_tags_df
 
-    File Source (report_data):
-        Users completion mark by course and group
-    """
-    errors = []
-    warnings = ['\nUser completion mark Report Warnings:\n']
-    # print('Length of report data: ' + str(len(report_data)))
-    # ad.debug_list(report_data)
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Tutor group is missing for student with '
-                            'Student ID {}'.format(student[2]))
-        if student[2] in (None, ''):
-            warnings.append('Student ID is missing for student with Name '
-                            '{}'.format(student[3]))
-        if student[3] in (None, ''):
-            warnings.append('Name is missing for student with Student '
-                            'ID {}'.format(student[2]))
-    # Check if any errors have been identified, save error log if they have
-    if len(errors) > 0:
-        ft.process_error_log(errors, 'User Completion Mark Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
 
+def check_review_warnings():
+    """Return True or False for reviewing warning messages.
 
-def check_umt(report_data):
-    """Return list of warnings for information in User Mark T only report file.
+    Returns:
+        True if user wants to review warning messages, False otherwise.
+    """
+    review = ''
+    while review == '':
+        review = input('\nDo you want to view the warning messages? y/n --> ')
+        if review not in ('y', 'n'):
+            print('\nThat is not a valid answer! Please try again.')
+            review = ''
+        elif review == 'y':
+            return True
+        else:
+            return False
 
-    Checks the Users marked by tutor only report data to see if the required
-    information is present. Missing or incorrect information that is non-fatal
-    is appended to a warnings list and returned.
 
+def check_tutor_ids(tutors, students):
+    """Check Tutor IDs in student data are in Tutor ID list.
+    
+    Checks that the Tutor ID for each student is contained in the list of valid
+    Tutor IDs. If invalid Tutor IDs are found they students concerned are
+    printed to the screen, an error file is created and the program exits.
+    
     Args:
-        report_data (list): Users marked by tutor only report data.
-
-    Returns:
-        True if warnings list has had items appended to it, False otherwise.
-        warnings (list): Warnings that have been identified in the data.
-
-    File Structure (Users marked by tutor only):
-        Course, Tutor group, Student ID, Student, Tutor, Head Tutor, Manager
-        
-    File Source(Users marked by tutor):
-        Users marked by tutor but not head tutor or manager
+        tutors (list): List of valid Tutor IDs.
+        students (DataFrame): Student Database Tags data.
     """
-    errors = []
-    warnings = ['\nUsers marked complete tutor only Report Warnings:\n']
-    for student in report_data:
-        if student[1] in (None, ''):
-            warnings.append('Tutor group is missing for student with '
-                            'Student ID {}'.format(student[2]))
-        if student[2] in (None, ''):
-            warnings.append('Student ID is missing for student with Name '
-                            '{}'.format(student[3]))
-        if student[3] in (None, ''):
-            warnings.append('Name is missing for student with Student '
-                            'ID {}'.format(student[2]))
+    invalid = students[~students['Tutor ID'].isin(tutors)]
+    errors = ['Tutor ID {} appears for the Student with the Student ID number '
+              'of {}. This Tutor ID does not appear in the list of valid '
+              'Tutor IDs.'.format(tutor_id, student) for tutor_id, student in
+              zip(invalid['Tutor ID'], invalid['StudentID'])]
     # Check if any errors have been identified, save error log if they have
     if len(errors) > 0:
-        ft.process_error_log(errors, 'Users marked by tutor only Report')
-    # Check if any warnings have been identified, save error log if they have
-    if len(warnings) > 1:
-        return True, warnings
-    else:
-        return False, warnings
+        ft.process_error_log(errors, 'Tutor_ID_Numbers')
 
 
 def clean_insightly(raw_data):
     """Clean data in the Insightly data.
     
-    Extracts the desired columns from the Insightly data and cleans the raw
-    data.
+    Strips surrounding spaces from each column of the Insightly data.
     
     Args:
-        raw_data (list): Raw insightly data.
+        raw_data (DataFrame): Raw insightly data.
         
     Returns:
-        cleaned_data (list): Insightly data that has been cleaned.
+        cleaned_data (DataFrame): Insightly data that has been cleaned.
     
     File structure (report_data):
         StudentID, First Name, Last Name, Tags.
@@ -1179,15 +589,9 @@ def clean_insightly(raw_data):
     File source (report_data):
         Insightly Data Dump (using columns listed in File structure).
     """
-    cleaned_data = []
-    for student in raw_data:
-        cleaned_student = []
-        # Extract and clean desired columns
-        cleaned_student.append(student[0].strip())
-        cleaned_student.append(student[1].strip())
-        cleaned_student.append(student[2].strip())
-        cleaned_student.append(student[3].strip())
-        cleaned_data.append(cleaned_student)
+    cleaned_data = raw_data.copy()
+    for column in cleaned_data:
+        cleaned_data[column] = cleaned_data[column].str.strip()
     return cleaned_data
 
 
@@ -1198,7 +602,7 @@ def clean_last_quiz_date(report_data):
     'DD/MM/YYYY'.
     
     Args:
-        report_data (list): Raw Last quiz date data.
+        report_data (DataFrame): Raw Last quiz date data.
         
     Returns:
         cleaned_data (list): Last quiz date data that has been cleaned.
@@ -1209,27 +613,17 @@ def clean_last_quiz_date(report_data):
     File Source (report_data):
         Last quiz date (all courses)
     """
-    cleaned_data = []
     print('\nCleaning Last Quiz Date')
-    num_students = len(report_data) # For calculating % complete
-    n = 0
-    for student in report_data:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        cleaned_student = []
-        cleaned_student.append(student[0].strip())
-        cleaned_student.append(student[1].strip())
-        cleaned_student.append(extract_course_code(student[2].strip()))
-        cleaned_student.append(extract_last_submission_date_3
-                               (student[3].strip()))
-        cleaned_data.append(cleaned_student)
-    '''
-    print('\nDebugging clean_last_subs_date')
-    ad.debug_list(cleaned_data)
-    '''
-    print('\rFinished cleaning Last Sub Date')
+    quizzes = report_data.copy()
+    quizzes.columns = range(4)
+    for column in quizzes:
+        quizzes[column] = quizzes[column].str.strip()
+    quizzes[2] = get_courses(quizzes[2])[0].astype(object)
+    # Convert the Last quiz dates to DD/MM/YYYY. 01/01/1970 is kept so that
+    # students without a quiz fall into the Black zone
+    quizzes[3] = normalise_dates(quizzes[3], nil_null=False)[1]
+    cleaned_data = quizzes.values.tolist()
+    print('\rFinished cleaning Last Quiz Date')
     return cleaned_data
 
 
@@ -1240,7 +634,7 @@ def clean_last_subs_date(report_data):
     'DD/MM/YYYY'.
     
     Args:
-        report_data (list): Raw Last submission date data.
+        report_data (DataFrame): Raw Last submission date data.
         
     Returns:
         cleaned_data (list): Last submission date data that has been cleaned.
@@ -1251,39 +645,35 @@ def clean_last_subs_date(report_data):
     File Source (report_data):
         Last submission date (all courses)
     """
-    cleaned_data = []
     print('\nCleaning Last Sub Date')
-    num_students = len(report_data) # For calculating % complete
-    n = 0
-    for student in report_data:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        cleaned_student = []
-        cleaned_student.append(student[0].strip())
-        cleaned_student.append(student[1].strip())
-        cleaned_student.append(extract_course_code(student[2].strip()))
-        cleaned_student.append(student[3].strip())
-        # Extract desired date portion _ TO BE WRITTEN
-        # Can this be fixed using the check on separator function?
-        cleaned_student.append(extract_last_submission_date_3
-                               (student[4].strip()))
-        cleaned_data.append(cleaned_student)
-    '''
-    print('\nDebugging clean_last_subs_date')
-    ad.debug_list(cleaned_data)
-    '''
+    subs = report_data.copy()
+    subs.columns = range(5)
+    for column in subs:
+        subs[column] = subs[column].str.strip()
+    subs[2] = get_courses(subs[2])[0].astype(object)
+    # Convert the Last submission dates to DD/MM/YYYY. 01/01/1970 is kept so
+    # that students without a submission fall into the Black zone
+    subs[4] = normalise_dates(subs[4], nil_null=False)[1]
+    cleaned_data = subs.values.tolist()
     print('\rFinished cleaning Last Sub Date')
     return cleaned_data
 
 
+def clear_date_cache():
+    """Clear the parsed dates and the date counts before running a report."""
+    DATE_CACHE.clear()
+    for key in DATE_STATS:
+        DATE_STATS[key] = 0
+
+
 def combine_sub_data(last_sub, last_quiz):
     """Return combined last_sub and last_quiz data.
     
     Returns the latest submission date for each student. If student appears in
     both lists, the latest date is returned for that student. If student only
-    appears in one list, that submission date is returned.
+    appears in one list, that submission date is returned. Name, Course and
+    Tutor are taken from last_sub where the student is in it, otherwise from
+    last_quiz with a blank Tutor.
     
     Args:
         last_sub (list): Data from Last Submission (StudentID, Name, Course,
@@ -1294,63 +684,97 @@ def combine_sub_data(last_sub, last_quiz):
     Returns:
         combined_data (list): Student data with last student date added.
     """
-    combined_data = []
-    # Get a list of student ids i last_sub
-    last_sub_students = ad.extract_list_item(last_sub, 0)
-    # Get a list of student ids in last_quiz
-    last_quiz_students = ad.extract_list_item(last_quiz, 0)
     print('\nCombining Last Submission and Last Quiz Data')
-    num_students = len(last_sub) + len(last_quiz) # For calculating % complete
-    n = 0
-    # Work through last_sub data
-    for student in last_sub:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        cleaned_student = []
-        cleaned_student.append(student[0]) # Add Student ID
-        cleaned_student.append(student[1]) # Add Name
-        cleaned_student.append(student[2]) # Add Course
-        cleaned_student.append(student[3]) # Add Tutor
-        if student[0] in last_quiz_students:
-            # Need to find latest date
-            for quiz_student in last_quiz: # Find student in last_quiz
-                if quiz_student[0] == student[0]:
-                    # Find latest date
-                    sub_date = da.convert_to_datetime(student[4], '%d/%m/%Y')
-                    quiz_date = da.convert_to_datetime(quiz_student[3],
-                                                       '%d/%m/%Y')
-                    if sub_date > quiz_date:
-                        # Add date from last_sub
-                        cleaned_student.append(student[4])
-                    else:
-                        # Add date from last_quiz
-                        cleaned_student.append(quiz_student[3])
-                    break
-            combined_data.append(cleaned_student)
-        else:
-            cleaned_student.append(student[4]) # Add date from last_sub
-            combined_data.append(cleaned_student)
-    # Work through last_quiz data to get student that are in last_sub data
-    for student in last_quiz:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if student[0] not in last_sub_students:
-            # Add student to combined data
-            cleaned_student = []
-            cleaned_student.append(student[0]) # Add Student ID
-            cleaned_student.append(student[1]) # Add Name
-            cleaned_student.append(student[2]) # Add Course
-            cleaned_student.append('') # Add blank for Tutor
-            cleaned_student.append(student[3]) # Add last quiz date
-            combined_data.append(cleaned_student)
+    subs = pd.DataFrame(data=last_sub, columns=range(5))
+    quizzes = pd.DataFrame(data=last_quiz, columns=[0, 1, 2, 4])
+    quizzes[3] = '' # Add blank for Tutor
+    # last_sub rows first so that their details take precedence
+    combined = pd.concat([subs, quizzes[list(range(5))]], ignore_index=True)
+    # Parse each distinct date string once
+    combined[5] = parse_dates(combined[4], '%d/%m/%Y')
+    students = combined.groupby(0, sort=False)
+    details = students[[1, 2, 3]].first()
+    # Find the row holding the latest date for each student
+    latest = combined.sort_values(5, ascending=False, kind='mergesort',
+                                  na_position='last').drop_duplicates(0)
+    details[4] = latest.set_index(0)[4]
+    combined_data = details.reset_index().values.tolist()
+    print('\rFinished combining Last Submission and Last Quiz Data')
     return combined_data            
 
 
-def convert_e_date(students, sd_df_students):
+def confirm_files(report, required_files):
+    """Ask the user to confirm the required files are in place.
+    
+    Skipped when running in batch mode, where the files are given in the job
+    file.
+    
+    Args:
+        report (str): Name of the report.
+        required_files (list): Names of the files the report needs.
+    """
+    if BATCH['running']:
+        return
+    ad.confirm_files(report, required_files)
+
+
+def connect_tag_history(db_name=TAG_HISTORY_DB):
+    """Return a connection to the tag history store.
+    
+    Creates the tag history table and its indexes if they do not exist yet.
+    The table holds one row per student per Insightly Tags run and is only
+    ever appended to.
+    
+    Args:
+        db_name (str): (Optional) File name of the tag history store.
+    
+    Returns:
+        conn (Connection): Connection to the tag history store.
+    """
+    conn = sqlite3.connect(db_name)
+    conn.execute('CREATE TABLE IF NOT EXISTS tag_history (run_date TEXT, '
+                 'student_id TEXT, enrolment_id TEXT, student TEXT, '
+                 'course TEXT, tutor TEXT, tag TEXT)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_history_student ON '
+                 'tag_history (student_id, run_date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_history_run ON '
+                 'tag_history (run_date)')
+    return conn
+
+
+def convert_counts(data, column, label_cols):
+    """Return a column of counts converted to integers.
+    
+    Converts the whole column at once to a nullable integer column. Cells
+    that are not whole numbers are left blank and a warning is returned for
+    each of them.
+    
+    Args:
+        data (DataFrame): Report data.
+        column (str): Name of the column holding the counts.
+        label_cols (list): Columns used to identify a row in the warnings.
+    
+    Returns:
+        counts (Series): Int64 count for each row, <NA> where missing or not
+        a whole number.
+        warnings (list): Warning for each cell that could not be converted.
+    """
+    text = data[column].fillna('').astype(str).str.strip()
+    numbers = pd.to_numeric(text.where(text != ''), errors='coerce')
+    whole = numbers.notnull() & (numbers == numbers.round())
+    counts = numbers.where(whole).astype('Int64')
+    # Only build messages for the cells that could not be converted
+    bad = (text != '') & ~whole
+    warnings = []
+    for labels, value in zip(data.loc[bad, label_cols].values.tolist(),
+                             text[bad]):
+        warnings.append('{} for {} is not a whole number ({}) and has been '
+                        'left blank'.format(column, ', '.join(labels), value))
+    return counts, warnings
+
+
+def convert_e_date(students, sd_df_students, thresholds=None,
+                   ref_date=None):
     """Return student list with tag based on last submission date.
     
     Calculates the appropriate tag based on the last submission date.
@@ -1358,6 +782,9 @@ def convert_e_date(students, sd_df_students):
     Args:
         students (list): Student data.
         sd_df_students (list): List of active students.
+        thresholds (dict): (Optional) Days for each tag, see TAG_THRESHOLDS.
+        ref_date (Timestamp): (Optional) Date to count days from. Defaults
+        to today.
         
     Returns:
         updated_students (list): Students list returned with the Last 
@@ -1367,35 +794,12 @@ def convert_e_date(students, sd_df_students):
     List structure:
         Student ID, Student, Course, Tutor, Last submission date.
     """
-    updated_students = []
-    black_day = 139
-    red_day = 83
-    orange_day = 55
     print('\nConverting Enrolment Dates')
-    for student in students:
-        if student[0] not in sd_df_students: # Skip non-active students
-            continue
-        updated_student = []
-        # Get number of days enrolled for
-        # print('Student passed to get_days_passed: {}'.format(student))
-        days_passed = da.get_days_past(student[4], '/', '/')
-        # print('\n\n\nDays past for {}: {}\n'.format(student[0], days_passed))
-        if days_passed == None:
-            tag = 'Green'
-        elif days_passed > black_day:
-            tag = 'Black'
-        elif days_passed > red_day:
-            tag = 'Red'
-        elif days_passed > orange_day:
-            tag = 'Orange'
-        else:
-            tag = 'Green'
-        updated_student.append(student[0])
-        updated_student.append(student[1])
-        updated_student.append(student[2])
-        updated_student.append(student[3])
-        updated_student.append(tag)
-        updated_students.append(updated_student)
+    students = pd.DataFrame(data=students, columns=range(5))
+    # Skip non-active students
+    students = students[students[0].isin(set(sd_df_students))].copy()
+    students[4] = get_zones(students[4], thresholds, ref_date).astype(str)
+    updated_students = students.values.tolist()
     print('\rFinished converting Enrolment Dates')
     return updated_students
         
@@ -1413,219 +817,91 @@ def convert_purple(students, purple):
     Returns:
         updated_students (list): Student ID and Tag.
     """
-    updated_students = []
     print('\nConverting Purple Tags')
-    num_students = len(students) # For calculating % complete
-    n = 0
-    for student in students:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        updated_student = []
-        updated_student.append(student[0])
-        if student[0] in purple:
-            updated_student.append('Purple')
-        else:
-            updated_student.append(student[1])
-        updated_students.append(updated_student)
+    purple = set(purple)
+    updated_students = [[student[0], 'Purple' if student[0] in purple else
+                         student[1]] for student in students]
     print('\rFinished Converting Purple Tags')
     return updated_students            
 
 
-def extract_course_code(course):
-    """Extract the course code.
+def diff_tags(source_df, tags_df, headings, tag_name):
+    """Return the old and new tags for each student and a mask of changes.
     
-    Looks for the course code in a course string (XXX-XX-XXX). If it is present
-    it returns the course code. If it is not present it returns 'Skip'.
+    Joins the source data (Student Database or Insightly) to the updated tags
+    on Student ID and compares the old Tag with the new tag for every student
+    at once. Where both DataFrames have a column of the same name the value
+    from source_df is kept.
     
     Args:
-        course (str): Full course name to be searched.
+        source_df (DataFrame): sid_name, tag_name and any other columns in
+        headings that are not in tags_df.
+        tags_df (DataFrame): Updated tags data.
+        headings (list): sid_name, two details columns, new_tags_name.
+        tag_name (str): Column name for Tag.
     
     Returns:
-        Either the course code or 'Skip' if a course code cannot be found.
+        combined (DataFrame): sid_name, headings[1], headings[2], tag_name,
+        new_tags_name for each student in both DataFrames.
+        changed (Series): True where the old and new tags are different.
     """
-    if re.search('.+\(.+-.+-.+\)', course):
-        # Extract the course code and return it
-        start = course.index('(')
-        return course[start+1:-1]
-    else:
-        return 'Skip'
+    combined = pd.merge(source_df, tags_df, on=headings[0], how='inner',
+                        suffixes=('', '_new'))
+    combined = combined[[headings[0], headings[1], headings[2], tag_name,
+                         headings[3]]]
+    changed = combined[tag_name] != combined[headings[3]]
+    return combined, changed
 
 
-def extract_last_submission_date(date):
-    """Return the date in the format DD-MM-YYYY.
+def evict_input_cache(max_bytes=INPUT_CACHE_MAX_BYTES):
+    """Remove the least recently used entries from the input cache.
     
-    Replaces the provided date with one in the format DD-MM-YYYY. The separator
-    that is used is a '/'. Input date should be in the format 
-    YYYY-MM-DD hh:mm...
+    Entries are removed, oldest use first, until the cache is no larger than
+    max_bytes.
     
     Args:
-        date (str): Date to be processed.
-        
-    Returns:
-        new_date (str): Date in the format DD-MM-YYYY.
-    """
-    # Find location of the first separator and extract DD
-    # print(date)
-    sep = ('-')
-    first_sep = date.find(sep)
-    years = date[:first_sep]
-    #print(years)
-    # Find location of the second seperator and extract MM
-    remaining = date[first_sep + 1:]
-    second_sep = remaining.find(sep)
-    months = remaining[:second_sep]
-    # Extract DD
-    date_end = second_sep + 3
-    days = remaining[second_sep + 1:date_end]
-    # Return up to the end of the date (DD/MM/YYYY)
-    new_date = days + sep + months + sep + years
-    #print(new_date)
-    return new_date
-
-
-def extract_last_submission_date_2(date):
-    """Return the date in the format DD/MM/YYYY.
-    
-    Replaces the provided date with one in the format DD/MM/YYYY. Finds the
-    first empty character and returns from the start of the string to one 
-    character prior to the empty charachter. Input date should be in the format 
-    DD/MM/YYYY hh:mm... A leading 0 is added to the day if one is missing.
-     
-    Args:
-        date (str): Date to be processed.
-        
-    Returns:
-        new_date (str): Date in the format DD-MM-YYYY.
+        max_bytes (int): (Optional) Maximum size of the cache in bytes.
     """
-    space = date.index(' ')
-    date = date[:space]
-    if len(date) == 10:
-        new_date = date
-    elif len(date) == 9:
-        new_date = '0' + date
-    else:
-        return date
-    return new_date
-
-
-def extract_last_submission_date_3(date):
-    """Return the date in the format DD/MM/YYYY.
-    
-    Replaces the provided date with one in the format DD/MM/YYYY. The separator
-    that is used is a '-'. Input date should be in the format 
-    YYYY-MM-DD hh:mm...
-    
-    Args:
-        date (str): Date to be processed.
-        
-    Returns:
-        new_date (str): Date in the format DD-MM-YYYY.
-    """
-    # Find location of the first separator and extract DD
-    # print(date)
-    sep = '-'
-    new_sep = '/'
-    first_sep = date.find(sep)
-    years = date[:first_sep]
-    #print(years)
-    # Find location of the second seperator and extract MM
-    remaining = date[first_sep + 1:]
-    second_sep = remaining.find(sep)
-    months = remaining[:second_sep]
-    # Extract DD
-    date_end = second_sep + 3
-    days = remaining[second_sep + 1:date_end]
-    # Return up to the end of the date (DD/MM/YYYY)
-    new_date = days + new_sep + months + new_sep + years
-    #print(new_date)
-    return new_date
-
-
-def extract_last_submission_date_4(date):
-    """Return the date in the format DD/MM/YYYY.
-    
-    Replaces the provided date with one in the format DD/MM/YYYY. The separator
-    that is used is a '/'. Input date should be in the format 
-    DD/MM/YYYY hh:mm...
-    
-    Args:
-        date (str): Date to be processed.
-        
-    Returns:
-        new_date (str): Date in the format DD-MM-YYYY.
-    """
-    # Find location of the first separator and extract DD
-    # print(date)
-    sep = '/'
-    new_sep = '/'
-    first_sep = date.find(sep)
-    days = date[:first_sep]
-    #print(years)
-    # Find location of the second seperator and extract MM
-    remaining = date[first_sep + 1:]
-    second_sep = remaining.find(sep)
-    months = remaining[:second_sep]
-    # Extract DD
-    date_end = second_sep + 5
-    years = remaining[second_sep + 1:date_end]
-    # Return up to the end of the date (DD/MM/YYYY)
-    new_date = days + new_sep + months + new_sep + years
-    #print(new_date)
-    return new_date
+    if not os.path.isdir(INPUT_CACHE_DIR):
+        return
+    entries = []
+    total = 0
+    for name in os.listdir(INPUT_CACHE_DIR):
+        path = os.path.join(INPUT_CACHE_DIR, name)
+        if not os.path.isdir(path):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in
+                   os.listdir(path))
+        entries.append((os.path.getmtime(path), size, path))
+        total += size
+    for last_used, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
 
 
 def extract_tag(raw_data):
     """Replace Contact tag with Status tag.
     
     Replaces the Tags field with the tag for their status, extracted
-    from the Tags list.
+    from the Tags list. Where more than one status tag is present the first in
+    STATUS_TAGS is used.
     
     Args:
-        raw_data (str): String containing Contact tag data.
+        raw_data (Series): Contact tag data for each student.
         
     Returns:
-        The colour of their status tag if found, 'N/A' otherwise.
-    """
-    if re.search('suspended', raw_data.lower()):
-        return 'Suspended'
-    elif re.search('withdrawn', raw_data.lower()):
-        return 'Withdrawn'
-    elif re.search('graduated', raw_data.lower()):
-        return 'Graduated'
-    elif re.search('expired', raw_data.lower()):
-        return 'Expired'
-    elif re.search('on hold', raw_data.lower()):
-        return 'On Hold'
-    elif re.search('cancelled', raw_data.lower()):
-        return 'Cancelled'
-    elif re.search('green', raw_data.lower()):
-        return 'Green'
-    elif re.search('orange', raw_data.lower()):
-        return 'Orange'
-    elif re.search('red', raw_data.lower()):
-        return 'Red'
-    elif re.search('black', raw_data.lower()):
-        return 'Black'
-    elif re.search('purple', raw_data.lower()):
-        return 'Purple'
-    else:
-        return 'N/A'
-
-
-def extract_tutor(tutor_data, tutor_pos):
-    """Extract a single tutor.
-
-    Args:
-        tutor_data (list): List containing tutor data.
-        tutor_pos (int): Location of the tutor to be extracted.
-
-    Returns:
-        tutor (list): A single tutor in a list.
+        Series with the status tag for each student if found, 'N/A'
+        otherwise.
     """
-    tutor = tutor_data[tutor_pos]
-    return tutor
+    codes, uniques, matches = match_tags(raw_data)
+    priority = {tag: i for i, tag in enumerate(STATUS_TAGS)}
+    found = matches.map(priority).dropna()
+    first = found.groupby(level=0).min()
+    labels = first.map(lambda i: STATUS_TAGS[int(i)].title())
+    labels = labels.reindex(range(len(uniques)), fill_value='N/A')
+    return pd.Series(codes, index=raw_data.index).map(labels).fillna('N/A')
 
 
 def find_missing(sd_df_s, lsd_tags_s):
@@ -1641,17 +917,9 @@ def find_missing(sd_df_s, lsd_tags_s):
     Returns:
         missing (list): Students that are missing from lsd_tags_s.
     """
-    missing = []
     print('\nFinding missing students')
-    num_students = len(sd_df_s) # For calculating % complete
-    n = 0
-    for student in sd_df_s:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if student not in lsd_tags_s:
-            missing.append(student)
+    present = set(lsd_tags_s)
+    missing = [student for student in sd_df_s if student not in present]
     print('\rFinished finding missing students')
     return missing    
 
@@ -1673,59 +941,67 @@ def get_active(sd_data, lsd_data, sid_name):
     List Structure (lsd_data):
         Student ID, Student, Course, Tutor, Last submission date.
     """
-    # Create a list with active students from sd_data
-    active = []
-    for index, row in sd_data.iterrows():
-        active.append(row[sid_name])     
-    # Check if each student from lsd_data is in active list
-    updated_lsd = []
-    for student in lsd_data:
-        if student[0] in active:
-            updated_lsd.append(student)
+    # Create a set with active students from sd_data
+    active = set(sd_data[sid_name])
+    # Check if each student from lsd_data is in active set
+    updated_lsd = [student for student in lsd_data if student[0] in active]
     # Return list with just the active lsd_data students
     return updated_lsd
 
 
-def get_changes(students):
+def get_cache_path(source, f_name):
+    """Return the input cache entry for a source file.
+    
+    The entry is named from a hash of the cache format, the pandas version,
+    the source code, the source's schema and checks (see SCHEMAS and
+    COLUMN_CHECKS) and the file's contents, so a changed file, schema or
+    check, or a different version of pandas, gets a new entry.
+    
+    Args:
+        source (str): The code for the table that the source data belongs to.
+        f_name (str): Name of the file, including '.csv'.
+    
+    Returns:
+        cache_path (str): Directory for the file's cache entry.
+    """
+    key = hashlib.sha256(repr((INPUT_CACHE_FORMAT, pd.__version__, source,
+                               SCHEMAS[source], COLUMN_CHECKS[source]))
+                         .encode('utf-8'))
+    key.update(get_file_hash(f_name).encode('utf-8'))
+    return os.path.join(INPUT_CACHE_DIR, key.hexdigest())
+
+
+def get_changes(students, tutor_name):
     """Count number of tags progressed and regressed per tutor.
     
-    Returns a dictionary with each tutor and a count of students progressed
-    and regressed for them. COmpares the value for Current Tag and Previous
-    Tag to determine if a student has progressed or regressed.
+    Returns a DataFrame with each tutor and a count of students progressed,
+    regressed and maintained for them. Compares Current_Tag with Previous_Tag
+    to determine if a student has progressed or regressed.
     
     Args:
-        students (list): Student Tags data
+        students (DataFrame): Student Tags data from merge_tags().
+        tutor_name (str): Column name for Tutor.
         
     Returns:
-        tutor_dict (dict): Dictionary with changes count by tutor.
-        results (list): List of possible changes.
+        change_count (DataFrame): Tutor, Progressed, Regressed, Maintained,
+        sorted by Tutor.
     """
-    # Create a list of tutors from students
-    tutors = []
-    for student in students:
-        if student[4] not in tutors:
-            tutors.append(student[4])
-    # Create a dictionary with tutor names
-    # Create a list with the results
     results = ['Progressed', 'Regressed', 'Maintained']
-    tutor_dict = {}
-    for tutor in tutors:
-        tutor_dict[tutor] = {}
-        for result in results:
-            tutor_dict[tutor][result] = 0
-    # Update dictionary by going through students
-    for student in students:
-        tutor = student[4]
-        if student[7] < student[8]: # Student has regressed
-            tutor_dict[tutor]['Regressed'] += 1
-        elif student[7] > student[8]: # Student has progressed
-            tutor_dict[tutor]['Progressed'] += 1
-        else: # Student has maintained tag
-            tutor_dict[tutor]['Maintained'] += 1       
-    return tutor_dict, results
+    current = get_tag_codes(students['Current_Tag'])
+    previous = get_tag_codes(students['Previous_Tag'])
+    changes = pd.Series('Maintained', index=students.index)
+    changes[current > previous] = 'Progressed'
+    changes[current < previous] = 'Regressed'
+    # Count each change per tutor
+    change_count = pd.crosstab(students[tutor_name].fillna(''), changes)
+    change_count = change_count.reindex(columns=results, fill_value=0)
+    change_count.index.name = tutor_name
+    change_count.columns.name = None
+    change_count = change_count.reset_index()
+    return change_count
 
 
-def get_colour(en_dates):
+def get_colour(en_dates, thresholds=None, ref_date=None):
     """Return the max colour tag for each student.
     
     Separates the students into four lists depending on what colour tag they
@@ -1735,55 +1011,56 @@ def get_colour(en_dates):
     
     Args:
         en_dates (list): List of lists with Student ID and Enrolment Date.
+        thresholds (dict): (Optional) Days for each tag, see TAG_THRESHOLDS.
+        ref_date (Timestamp): (Optional) Date to count days from. Defaults
+        to today.
         
     Returns:
         black, red, orange, green (list): List for each colour with the
         students in that colour group (max).
     """
-    black, red, orange, green = ([] for i in range(4))
-    black_day = 139
-    red_day = 83
-    orange_day = 55
     print('\nGetting Colour Tags')
-    num_students = len(en_dates) # For calculating % complete
-    n = 0
-    for student in en_dates:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        # Get number of days enrolled for
-        enrolled_days = da.get_days_past(student[1])
-        if enrolled_days in (None, ''):
-            green.append(student[0])
-        elif enrolled_days > black_day:
-            black.append(student[0])
-        elif enrolled_days > red_day:
-            red.append(student[0])
-        elif enrolled_days > orange_day:
-            orange.append(student[0])
-        else:
-            green.append(student[0])
-    '''
-    print('\nBlack zone students:')
-    ad.debug_list(black)
-    print('\nRed zone students:')
-    ad.debug_list(red)
-    print('\nOrange zone students:')
-    ad.debug_list(orange)
-    print('\nGreen zone students:')
-    ad.debug_list(green)
-    '''
+    en_dates = pd.DataFrame(data=en_dates, columns=range(2))
+    zones = get_zones(en_dates[1], thresholds, ref_date)
+    black, red, orange, green = (en_dates.loc[zones == zone, 0].tolist() for
+                                 zone in ('Black', 'Red', 'Orange', 'Green'))
     print('\rFinished getting Colour Tags')
-    '''
-    print('Orange Tags: {}'.format(len(orange)))
-    print('{}'.format(orange))
-    print('Red Tags: {}'.format(len(red)))
-    print('{}'.format(red))
-    '''
     return black, red, orange, green        
 
 
+def get_courses(courses):
+    """Return the course code and delivery mode for each course name.
+    
+    Each distinct course name is parsed once by parse_course() and kept in
+    COURSE_CACHE. The results are returned as categoricals so that filtering
+    on the mode compares category codes.
+    
+    Args:
+        courses (Series): Full course names.
+    
+    Returns:
+        course_codes (Series): Categorical course code for each course, 'Skip'
+        if the course is not for students.
+        modes (Series): Categorical delivery mode for each course (one of
+        COURSE_MODES).
+    """
+    courses = pd.Series(courses, dtype=object)
+    codes, uniques = pd.factorize(courses.fillna(''))
+    for course in uniques:
+        if course not in COURSE_CACHE:
+            COURSE_CACHE[course] = parse_course(course)
+    unique_codes = pd.Categorical([COURSE_CACHE[course][0] for course in
+                                   uniques])
+    unique_modes = pd.Categorical([COURSE_CACHE[course][1] for course in
+                                   uniques], categories=COURSE_MODES)
+    course_codes = pd.Series(pd.Categorical.from_codes(
+            unique_codes.codes[codes], unique_codes.categories),
+            index=courses.index)
+    modes = pd.Series(pd.Categorical.from_codes(
+            unique_modes.codes[codes], COURSE_MODES), index=courses.index)
+    return course_codes, modes
+
+
 def get_enrol_dates(sd_data, s_id, e_date, sd_df_students):
     """Return list of enrolment dates.
     
@@ -1800,29 +1077,88 @@ def get_enrol_dates(sd_data, s_id, e_date, sd_df_students):
         colours (list): List of Student ID  and Enrolment date for each
         student.
     """
-    colours = []
     print('\nGetting Enrolment Dates')
-    num_students = len(sd_data) # For calculating % complete
-    n = 0
-    for index, row in sd_data.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if row[s_id] in sd_df_students: # Only get active students
-            student = []
-            student.append(row[s_id])
-            student.append(row[e_date])
-            colours.append(student)
+    # Only get active students
+    active = sd_data[s_id].isin(set(sd_df_students))
+    colours = sd_data.loc[active, [s_id, e_date]].values.tolist()
     print('\rFinished getting Enrolment Dates')
     return colours
 
 
+def get_expiry_windows(expiry_dates, ref_date=None):
+    """Return which students expire within each of the EXPIRY_PERIODS.
+    
+    Students that have already expired (before ref_date) are not in any
+    period. Students whose expiry date could not be read are in every period
+    so that they are still reported.
+    
+    Args:
+        expiry_dates (Series): Expiry date of each student.
+        ref_date (Timestamp): (Optional) Date periods are measured from.
+        Defaults to today.
+    
+    Returns:
+        windows (dict): Period: Series that is True for students expiring in
+        that period.
+    """
+    if ref_date is None:
+        ref_date = pd.Timestamp.now().normalize()
+    unknown = expiry_dates.isnull()
+    current = expiry_dates >= ref_date
+    windows = {}
+    for period, length in EXPIRY_PERIODS.items():
+        windows[period] = unknown | (current &
+                                     (expiry_dates <= ref_date + length))
+    return windows
+
+
+def get_file_hash(f_name):
+    """Return the SHA-256 hash of a file's contents.
+    
+    Args:
+        f_name (str): Name of the file.
+    
+    Returns:
+        Hex digest of the file's contents.
+    """
+    file_hash = hashlib.sha256()
+    with open(f_name, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_file_name(source):
+    """Return the name of the file to load for a source.
+    
+    Asks the user for the file name until the name of a file that exists is
+    entered.
+    
+    Args:
+        source (str): The code for the table that the source data belongs to.
+    
+    Returns:
+        f_name (str): Name of the file, without '.csv'.
+    """
+    while True:
+        f_name = input('\nEnter the name of the {} file (without .csv) --> '
+                       .format(source)).strip()
+        if f_name.endswith('.csv'):
+            f_name = f_name[:-4]
+        if f_name == '':
+            print('\nPlease enter a file name.')
+        elif not os.path.isfile('{}.csv'.format(f_name)):
+            print('\n{}.csv could not be found! Please try again.'.format(
+                    f_name))
+        else:
+            return f_name
+
+
 def get_id_changes(tags_df, id_df, headings, tag_name):
     """Return students that have had their tag changed from Insightly Data.
     
-    Merges id_df and tags_df. Compares Tags and Updated_Tags columns and if
-    they are different the student is added to the returned DataFrame.
+    Uses diff_tags() to compare the Tag in id_df with Updated_Tags in tags_df
+    and returns the students whose tag is different.
     
     Args:
         tags_df (DataFrame): sid_name, eid_name, stud_name, course_name,
@@ -1834,34 +1170,62 @@ def get_id_changes(tags_df, id_df, headings, tag_name):
     Returns:
         changed_students (DataFrame): Students that have changed tags.
     """
-    changed = []
     print('\nGetting Changes')
-    # Merge DataFrames
-    combined = pd.merge(id_df, tags_df, on = headings[0], how = 'inner')
-    new_headings = [headings[0], headings[1], headings[2], tag_name,
-                    headings[3]]
-    combined = combined[new_headings]
-    num_students = len(combined.index) # For calculating % complete
-    n = 0
-    # Extract students that have had their tag changed
-    for index, row in combined.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if row[tag_name] != row[headings[3]]:
-            student = []
-            student.append(row[headings[0]])
-            student.append(row[headings[1]])
-            student.append(row[headings[2]])
-            student.append(row[headings[3]])
-            changed.append(student)
-    changed_students = pd.DataFrame(data = changed, columns = headings)
+    combined, changed = diff_tags(id_df, tags_df, headings, tag_name)
+    changed_students = combined.loc[changed, headings]
     changed_students = changed_students.rename(columns={headings[3]:tag_name})
+    changed_students = changed_students.reset_index(drop=True)
     print('\rFinished getting Changes')
     return changed_students
 
 
+def get_menu():
+    """Return the menu options.
+    
+    Used by the menu and by batch mode, where jobs are given by their option
+    number.
+    
+    Returns:
+        menu (list): Label, function and function arguments for each option,
+        in menu order.
+    """
+    menu = [('Prepare Student Expiry Report - 10 Days', process_expiry,
+             ('10_Days_',)),
+            ('Prepare Student Expiry Report - 1 Month', process_expiry,
+             ('1_Month_',)),
+            ('Prepare Student Expiry Report - 3 Months', process_expiry,
+             ('3_Months_',)),
+            ('Prepare Submissions Made Report - 2 Weeks',
+             process_submissions_made_pt, ('2_Weeks_',)),
+            ('Prepare Submissions Made Report - 4 Weeks',
+             process_submissions_made_on, ('4_Weeks_',)),
+            ('Prepare Students Not Submitted Report - 2 Weeks',
+             process_not_submitted_pt, ('2_Weeks_',)),
+            ('Prepare Students Not Submitted Report - 4 Weeks',
+             process_not_submitted_on, ('4_Weeks_',)),
+            ('Prepare Last Login Report', process_last_login, ()),
+            ('Prepare Never Logged In Report', process_never_logged_in, ()),
+            ('Prepare Not Logged In Report - 1 Week',
+             process_not_logged_in_pt, ('1_Week_',)),
+            ('Prepare Not Logged In Report - 4 Weeks',
+             process_not_logged_in_on, ('4_Weeks_',)),
+            ('Prepare Completion Mark Course Group Report',
+             process_completion_mcg, ()),
+            ('Prepare Complete Tutor Only Report', process_complete_tut, ()),
+            ('Prepare Count of Completions Tutor Group Report',
+             process_completions_tut, ()),
+            ('Prepare Count of Unmarked Assessments Report',
+             process_count_ass_unmarked, ()),
+            ('Prepare Count of Students Per Tutor Report',
+             process_count_students_tut, ()),
+            ('Prepare Insightly Tags Updates Report', process_insightly_tags,
+             ()),
+            ('Prepare Tag History Report', process_tag_history, ()),
+            ('Prepare Student Expiry Reports - All Periods', process_expiry,
+             ('All',))]
+    return menu
+
+
 def get_purple(id_df, sid_name, tag_name):
     """Return a list of students with Purple for status.
     
@@ -1890,11 +1254,66 @@ def get_purple(id_df, sid_name, tag_name):
     return purple_students
 
 
+def get_regressed_students(runs=3, min_regressed=2, db_name=TAG_HISTORY_DB):
+    """Return students that have regressed repeatedly in recent runs.
+    
+    Looks at the changes between each of the last runs (plus the run before
+    them) in the tag history store and counts the number of times each
+    student has dropped down a colour tag. Students that have not got a colour
+    tag in both runs of a change are not counted for that change. Only changes
+    between consecutive runs are counted, so a run that the student is missing
+    from breaks the sequence.
+    
+    Args:
+        runs (int): (Optional) Number of recent changes to look at.
+        min_regressed (int): (Optional) Number of times a student must have
+        regressed to be returned.
+        db_name (str): (Optional) File name of the tag history store.
+    
+    Returns:
+        regressed (DataFrame): StudentID, Student, Tutor, Regressed, for the
+        latest run, sorted by Tutor and Student.
+    """
+    history = get_tag_history(runs + 1, db_name)
+    history = history.drop_duplicates(subset=['Run Date', 'StudentID'])
+    history = history.sort_values(['StudentID', 'Run Date'])
+    codes = get_tag_codes(history['Updated_Tags'])
+    prev_codes = codes.groupby(history['StudentID']).shift(1)
+    # Number each run so that changes across a missing run can be left out
+    run_numbers = history['Run Date'].rank(method='dense')
+    prev_runs = run_numbers.groupby(history['StudentID']).shift(1)
+    consecutive = prev_runs == run_numbers - 1
+    dropped = (consecutive & (codes >= 0) & (prev_codes >= 0) &
+               (codes < prev_codes))
+    counts = dropped.groupby(history['StudentID']).sum()
+    # Report the student's details from their latest run
+    latest = history.drop_duplicates(subset='StudentID', keep='last')
+    latest = latest.set_index('StudentID')[['Student', 'Tutor']]
+    latest['Regressed'] = counts.astype(int)
+    regressed = latest[latest['Regressed'] >= min_regressed].reset_index()
+    regressed = regressed.sort_values(['Tutor', 'Student'])
+    return regressed
+
+
+def get_schema(source):
+    """Return the column names and categorical columns for a source.
+    
+    Args:
+        source (str): The code for the table that the source data belongs to.
+    
+    Returns:
+        headings (list): Name of each column in the source file.
+        categories (list): Columns to be stored as categoricals.
+    """
+    headings, categories = SCHEMAS[source]
+    return headings, categories
+
+
 def get_sd_changes(sd_df, tags_df, headings, tag_name):
     """Return students that have had their tag changed from Student Database.
     
-    Merges sd_df and tags_df. Compares Tags and Updated_Tags columns and if
-    they are different the student is added to the returned DataFrame.
+    Uses diff_tags() to compare the Tag in sd_df with Updated_Tags in tags_df
+    and returns the students whose tag is different.
     
     Args:
         tags_df (DataFrame): sid_name, eid_name, stud_name, course_name,
@@ -1907,31 +1326,11 @@ def get_sd_changes(sd_df, tags_df, headings, tag_name):
     Returns:
         changed_students (DataFrame): Students that have changed tags.
     """
-    changed = []
     print('\nGetting Changes')
-    # Merge DataFrames
-    combined = pd.merge(sd_df, tags_df, on = headings[0], how = 'inner')
-    combined = combined.rename(columns={'EnrolmentID_x':'EnrolmentID'})
-    new_headings = [headings[0], headings[1], headings[2], tag_name,
-                    headings[3]]
-    combined = combined[new_headings]
-    # Extract students that have had their tag changed
-    num_students = len(combined.index) # For calculating % complete
-    n = 0
-    for index, row in combined.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if row[tag_name] != row[headings[3]]:
-            student = []
-            student.append(row[headings[0]])
-            student.append(row[headings[1]])
-            student.append(row[headings[2]])
-            student.append(row[headings[3]])
-            changed.append(student)
-    changed_students = pd.DataFrame(data = changed, columns = headings)
+    combined, changed = diff_tags(sd_df, tags_df, headings, tag_name)
+    changed_students = combined.loc[changed, headings]
     changed_students = changed_students.rename(columns={headings[3]:tag_name})
+    changed_students = changed_students.reset_index(drop=True)
     print('\rFinished getting Changes')
     return changed_students
 
@@ -1952,8 +1351,7 @@ def get_sd_df_students(students, sid_name, tag_name):
     """
     student_ids = []
     print('\nGetting Student ID\'s')
-    reserved = ['withdrawn', 'graduated', 'expired', 'suspended', 'on hold',
-                'cancelled', 'transferred']
+    reserved = RESERVED_TAGS
     num_students = len(students) # For calculating % complete
     n = 0
     for index, row in students.iterrows():
@@ -2007,46 +1405,119 @@ def get_students_list(students, location):
     return student_ids
     
 
-def get_s_course(student, sd, sid_name, c_name):
+def get_student_index(sd, tutor_dict, fname, lname, tid_name, sid_name,
+                      c_name):
+    """Return dictionary of student details keyed on Student ID.
+    
+    Builds the lookup used by get_s_name(), get_s_course() and get_t_name() so
+    that a student's details can be found without searching the Student
+    Database data. Name and Course are taken from the first entry for the
+    student in sd. Tutor name is taken from the first entry for the student
+    that has a Tutor ID listed in tutor_dict, or '' if there is none.
+    
+    Args:
+        sd (DataFrame): Student Database data.
+        tutor_dict (dict): Tutor ID: Tutor name, from get_tutor_dict().
+        fname (str): Column name for First Name.
+        lname (str): Column name for Last Name.
+        tid_name (str): Column name for Tutor ID.
+        sid_name (str): Column name for Student ID.
+        c_name (str): Column name for Course.
+    
+    Returns:
+        s_index (dict): Student ID: {'Name', 'Course', 'Tutor'}.
+    """
+    s_index = {}
+    print('\nIndexing Student Details')
+    # Name and Course come from the first entry for each student
+    first = sd.drop_duplicates(subset=sid_name)
+    names = first[fname].astype(str) + ' ' + first[lname].astype(str)
+    for student, name, course in zip(first[sid_name], names, first[c_name]):
+        s_index[student] = {'Name': name, 'Course': '{}'.format(course),
+                            'Tutor': ''}
+    # Tutor comes from the first entry for each student with a known Tutor ID
+    with_tutor = sd[sd[tid_name].isin(tutor_dict)].drop_duplicates(
+            subset=sid_name)
+    for student, tutor_id in zip(with_tutor[sid_name], with_tutor[tid_name]):
+        s_index[student]['Tutor'] = tutor_dict[tutor_id]
+    print('\rFinished indexing Student Details')
+    return s_index
+
+
+def get_s_course(student, s_index):
     """Return student course.
       
     Args:
         student (str): Student ID Number.
-        sd (DataFrame): Student Database data.
-        sid_name (str): Column name for Student ID.
-        c_name (str): Column name for Course name.
+        s_index (dict): Student details from get_student_index().
+    
+    Returns:
+        course (str): Student's course.
+    """
+    if student in s_index:
+        return s_index[student]['Course']
+    return ''
+
+
+def get_s_name(student, s_index):
+    """Return student name.
+    
+    Finds the student's First name and Last name in the student index and
+    returns a formatted string.
+    
+    Args:
+        student (str): Student ID Number.
+        s_index (dict): Student details from get_student_index().
+    
+    Returns:
+        name (str): First name + Last name
+    """
+    if student in s_index:
+        return s_index[student]['Name']
+    return ''
+
+
+def get_tag_history(runs, db_name=TAG_HISTORY_DB):
+    """Return the Updated_Tags of the most recent runs in the tag history.
+    
+    Args:
+        runs (int): Number of most recent runs to return.
+        db_name (str): (Optional) File name of the tag history store.
     
     Returns:
-        course (str): Student's course.
+        history (DataFrame): Run Date, StudentID, EnrolmentID, Student,
+        Course, Tutor, Updated_Tags.
     """
-    for index, row in sd.iterrows():
-        if row[sid_name] == student:
-            course = '{}'.format(row[c_name])
-            return course
-    return ''
+    conn = connect_tag_history(db_name)
+    run_dates = [row[0] for row in conn.execute(
+            'SELECT DISTINCT run_date FROM tag_history ORDER BY run_date DESC '
+            'LIMIT ?', (runs,))]
+    first_run = min(run_dates) if run_dates else ''
+    history = pd.read_sql_query(
+            'SELECT run_date, student_id, enrolment_id, student, course, '
+            'tutor, tag FROM tag_history WHERE run_date >= ?', conn,
+            params=(first_run,))
+    conn.close()
+    history.columns = ['Run Date'] + TAG_HISTORY_HEADINGS
+    return history
 
 
-def get_s_name(student, sd, fname, lname, sid_name):
-    """Return student name.
+def get_tag_codes(tags):
+    """Return the position of each tag in TAG_ORDER.
     
-    Finds the student's First name and Last name in the Student Data and
-    returns a formatted string.
+    The position can be compared directly, e.g. Green (3) is higher than
+    Orange (2). Tags that are not colour tags (Purple, reserved statuses,
+    'N/A') are given -1.
     
     Args:
-        student (str): Student ID Number.
-        sd (DataFrame): Student Database data.
-        fname (str): Column name for First Name.
-        lname (str): Column name for Last Name.
-        sid_name (str): Column name for Student ID.
+        tags (Series): Tags.
     
     Returns:
-        name (str): First name + Last name
+        codes (Series): Position of each tag in TAG_ORDER, -1 otherwise.
     """
-    for index, row in sd.iterrows():
-        if row[sid_name] == student:
-            name = '{} {}'.format(row[fname], row[lname])
-            return name
-    return ''
+    tags = pd.Series(tags)
+    codes = pd.Categorical(tags, categories=TAG_ORDER, ordered=True).codes
+    return pd.Series(codes, index=tags.index)
 
 
 def get_tags(students, black, red, orange, green):
@@ -2061,30 +1532,15 @@ def get_tags(students, black, red, orange, green):
     Returns:
         updated_students (list): Students with Tag_start and Zone.
     """
-    updated_students = []
     print('\nGetting Student Tags')
-    num_students = len(students) # For calculating % complete
-    n = 0
-    for student in students:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        updated_student = []
-        if student[0] in black:
-            zone = 'Black'
-        elif student[0] in red:
-            zone = 'Red'
-        elif student[0] in orange:
-            zone = 'Orange'
-        elif student[0] in green:
-            zone = 'Green'
-        else:
-            zone = 'N/A'
-        updated_student.append(student[0])
-        updated_student.append(student[4])
-        updated_student.append(zone)
-        updated_students.append(updated_student)
+    # Map each student to a zone, later zones taking priority (Black highest)
+    zones = {}
+    for zone, zone_students in (('Green', green), ('Orange', orange),
+                                ('Red', red), ('Black', black)):
+        for student in zone_students:
+            zones[student] = zone
+    updated_students = [[student[0], student[4], zones.get(student[0], 'N/A')]
+                        for student in students]
     print('\rFinished getting Student Tags')
     return updated_students
 
@@ -2100,95 +1556,53 @@ def get_tags_students(students, valid_students, location):
     Returns:
         student_ids (list): List of Student ID numbers.
     """
-    student_ids = []
     print('\nGetting Student ID\'s')
-    num_students = len(students) # For calculating % complete
-    n = 0
-    for student in students:
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        if student[location] in valid_students:
-            student_ids.append(student[location])
+    valid_students = set(valid_students)
+    student_ids = [student[location] for student in students if
+                   student[location] in valid_students]
     print('\rFinished getting Student ID\'s')
     return student_ids
 
 
-def get_tags_values(students):
-    """Return list with tag values added.
+def get_time_string():
+    """Return the time string used in the names of saved files.
     
-    For each student the tag value for old tag and new tag is appended to the
-    student's data and returned as a list. This can be used to determine
-    whether the student has progressed or regressed.
-    
-    Args:
-        students (list): StudentID, EnrolmentID, Name, Course, Tutor,
-        Current_Tag, Previous_Tag.
+    In a batch job the job's number is added, so that jobs running at the same
+    time (e.g. two expiry reports for the same period) do not save over each
+    other's files.
     
     Returns:
-        updated_students (list): Tag values added.
+        time_string (str): Time string from ft.generate_time_string(), plus
+        '_Job' and the job number in a batch job.
     """
-    # Allocated values to tags
-    green_val = 4
-    orange_val = 3
-    red_val = 2
-    black_val = 1
-    updated_students = []
-    for student in students:
-        this_student = []
-        # Add existing student data
-        i = 0
-        while i < 7:
-            this_student.append(student[i])
-            i += 1
-        # Add value for Current_tag
-        if student[5] == 'Green':
-            this_student.append(green_val)
-        elif student[5] == 'Orange':
-            this_student.append(orange_val)
-        elif student[5] == 'Red':
-            this_student.append(red_val)
-        else:
-            this_student.append(black_val)
-        # Add value for Previous_tag
-        if student[6] == 'Green':
-            this_student.append(green_val)
-        elif student[6] == 'Orange':
-            this_student.append(orange_val)
-        elif student[6] == 'Red':
-            this_student.append(red_val)
-        else:
-            this_student.append(black_val)
-        updated_students.append(this_student)
-    return updated_students              
+    time_string = ft.generate_time_string()
+    if BATCH['job'] is not None:
+        time_string = '{}_Job{}'.format(time_string, BATCH['job'])
+    return time_string
 
 
-def get_tutor_changes(changes_tutor, changes_list):
-    """Create list with Tutor changes counts.
+def get_tutor_dict(tutors, headings):
+    """Return dictionary of Tutor names keyed on Tutor ID.
     
-    Extracts the data from the nested Dictionaries and returns it as a list.
+    Built once from the Tutor_IDs.csv information and shared by the functions
+    that need to look up a Tutor's name. If a Tutor ID appears more than once
+    the first entry is used.
     
     Args:
-        changes_tutor (dict): Nested dictionary of tutor changes counts.
-        changes_list (list): 'Progressed', 'Regressed', 'Maintained'
+        tutors (DataFrame): TutorIDs.csv information.
+        headings (list): tid_name, fname_name, lname_name.
     
     Returns:
-        change_count (list): Change counts as a list
+        tutor_dict (dict): Tutor ID: First + Last Name.
     """
-    change_count = []
-    for tutor, values in changes_tutor.items():
-        this_tutor = []
-        this_tutor.append(tutor)
-        i = 0
-        while i < 3:
-            this_tutor.append(changes_tutor[tutor][changes_list[i]])
-            i += 1
-        change_count.append(this_tutor)
-    return change_count
+    first = tutors.drop_duplicates(subset=headings[0])
+    names = first[headings[1]].astype(str) + ' ' + first[headings[2]].astype(
+            str)
+    tutor_dict = dict(zip(first[headings[0]], names))
+    return tutor_dict
 
 
-def get_tutor_stats(prev_month, this_month, a_loc = 0, b_loc = 0):
+def get_tutor_stats(prev_month, this_month, headings):
     """Return number of students progressing and regressing per tutor.
     
     Regressed students are those that have drop down a tag colour, e.g. from
@@ -2197,101 +1611,106 @@ def get_tutor_stats(prev_month, this_month, a_loc = 0, b_loc = 0):
     ignored for this analysis.
     
     Args:
-        prev_month (list): Tag data from previous month.
-        this_month (list): Tag data from current month.
-        a_loc (int) Location of Student ID in this_month
-        b_loc (int) Location of Student ID in prev_month
+        prev_month (DataFrame): Tag data from previous month.
+        this_month (DataFrame): Tag data from current month.
+        headings (list): sid_name, eid_name, stud_name, course_name,
+        tutor_name, new_tags_name.
     
     Returns:
-        tutor_data (dict): Tutor data stored in a dictionary.
+        change_count (DataFrame): Tutor, Progressed, Regressed, Maintained.
         
     Data format:
         StudentID, EnrolmentID, Student, Course, Tutor, Updated_Tags
     """
-    # Get list of students in each group
-    a_students = get_students_list(this_month, a_loc)
-    b_students = get_students_list(prev_month, b_loc)
-    # Get list of students in both lists
-    common = ad.get_common(a_students, b_students)
-    # Get tag information for desired sudents from both lists
-    tag_merge = merge_tags(this_month, prev_month, common)
+    # Get tag information for students in both months
+    tag_merge = merge_tags(this_month, prev_month, headings)
     # Analyse number of progressed and regressed for each tutor
-    tutor_data, change_list = get_changes(tag_merge)
-    return tutor_data, change_list
+    change_count = get_changes(tag_merge, headings[4])
+    return change_count
 
 
-def get_tutor_tags(tags_tutor, tag_list):
-    """Cretae list with Tutor Tag counts.
+def get_tutor_trends(runs=12, db_name=TAG_HISTORY_DB):
+    """Return the number of each tag per tutor for recent runs.
     
-    Extracts the data from the nested Dictionaries and returns it as a list.
+    The counts are made by the tag history store, so only the totals are
+    read back.
     
     Args:
-        tags_tutor (dict): Nested dictionary of tutor tag counts.
-        tag_list (list): 'Green', 'Orange', 'Red', 'Black', 'Purple'
+        runs (int): (Optional) Number of most recent runs to include.
+        db_name (str): (Optional) File name of the tag history store.
     
     Returns:
-        tag_count (list): List with tag counts per tutor.
+        trends (DataFrame): Tutor, Run Date, Green, Orange, Red, Black,
+        Purple, sorted by Tutor and Run Date.
     """
-    tag_count = []
-    for tutor, values in tags_tutor.items():
-        this_tutor = []
-        this_tutor.append(tutor)
-        i = 0
-        while i < 5:
-            this_tutor.append(tags_tutor[tutor][tag_list[i]])
-            i += 1
-        tag_count.append(this_tutor)
-    return tag_count
-
-
-def get_t_name(student, sd, tutors, fname, lname, tid_name, sid_name):
+    tags = ['Green', 'Orange', 'Red', 'Black', 'Purple']
+    conn = connect_tag_history(db_name)
+    run_dates = [row[0] for row in conn.execute(
+            'SELECT DISTINCT run_date FROM tag_history ORDER BY run_date DESC '
+            'LIMIT ?', (runs,))]
+    first_run = min(run_dates) if run_dates else ''
+    counts = pd.read_sql_query(
+            'SELECT tutor, run_date, tag, COUNT(*) FROM tag_history WHERE '
+            'run_date >= ? GROUP BY tutor, run_date, tag', conn,
+            params=(first_run,))
+    conn.close()
+    counts.columns = ['Tutor', 'Run Date', 'Tag', 'Count']
+    counts['Tutor'] = rename_tutor(counts['Tutor'])
+    trends = counts.pivot_table(index=['Tutor', 'Run Date'], columns='Tag',
+                                values='Count', aggfunc='sum', fill_value=0)
+    trends = trends.reindex(columns=tags, fill_value=0)
+    trends.columns.name = None
+    trends = trends.reset_index()
+    return trends
+
+
+def get_t_name(student, s_index):
     """Return tutor name.
     
-    Finds the student's tutor's First name and Last name in the Tutors Data and
-    returns a formatted string.
+    Finds the student's tutor's First name and Last name in the student index
+    and returns a formatted string.
     
     Args:
         student (str): Student ID Number.
-        sd (DataFrame): Student Database data.
-        tutors (DataFrame): Tutors ID, First name and Last name.
-        fname (str): Column name for First Name.
-        lname (str): Column name for Last Name.
-        tid_name (str): Column name for Tutor ID.
-        sid_name (str): Column name for Student ID.
+        s_index (dict): Student details from get_student_index().
     
     Returns:
         name (str): First name + Last name
     """
-    # Find Student ID data in sd and identify Tutor ID
-    for index, row in sd.iterrows():
-        if row[sid_name] == student:
-            tutor_id = row[tid_name]
-            # Find Tutor ID and return formatted name
-            for index_t, row_t in tutors.iterrows():
-                if row_t[tid_name] == tutor_id:
-                    name = '{} {}'.format(row_t[fname], row_t[lname])
-                    return name
+    if student in s_index:
+        return s_index[student]['Tutor']
     return ''
 
 
-def list_expired(expiry):
-    """Replaces the timestamps of students that have expired with 'Expired'.
+def get_zones(dates, thresholds=None, ref_date=None):
+    """Return the tag zone for each date in a column.
     
-    Converts the timestamp information into datetime and then compares to the
-    current date. Those that are expired are overwritten with 'Expired'.
+    Parses the whole column of 'DD/MM/YYYY' dates, counts the days from each
+    date to ref_date and bins the days using the thresholds. Dates that are
+    missing or cannot be read are put in the Green zone.
     
     Args:
-        expiry (str): Timestamp information for student expiry.
-        
+        dates (Series): Dates in the format 'DD/MM/YYYY'.
+        thresholds (dict): (Optional) Tag: days after which a date falls into
+        that tag's zone. Defaults to TAG_THRESHOLDS.
+        ref_date (Timestamp): (Optional) Date to count days from. Defaults
+        to today.
+    
     Returns:
-        'Expired' if the student has expired, the input timestamp otherwise.
+        zones (Series): Categorical zone for each date.
     """
-    current_date = dt.datetime.now()
-    expired_date = pd.to_datetime(expiry, errors='coerce')
-    if expired_date < current_date:
-        return 'Expired'
-    else:
-        return expiry
+    if thresholds is None:
+        thresholds = TAG_THRESHOLDS
+    if ref_date is None:
+        ref_date = pd.Timestamp.now().normalize()
+    # Order the zones from fewest to most days, Green being below all of them
+    limits = sorted(thresholds.items(), key=lambda item: item[1])
+    bins = [float('-inf')] + [days for tag, days in limits] + [float('inf')]
+    labels = ['Green'] + [tag for tag, days in limits]
+    parsed = parse_dates(dates, '%d/%m/%Y')
+    days = (ref_date - parsed).dt.days
+    zones = pd.cut(days, bins=bins, labels=labels).fillna('Green')
+    return zones
 
 
 def list_non_active(status):
@@ -2312,24 +1731,6 @@ def list_non_active(status):
         return 'Skip'
 
 
-def list_non_on(course):
-    """Replaces the course name of non-online courses with 'Skip'.
-    
-    Checks for online courses by looking for 'ON' in the course name. Those
-    without 'ON' are overwritten with 'Skip'.
-    
-    Args:
-        course (str): Information for course name.
-        
-    Returns:
-        'Skip' if the course is not online, the passed course otherwise.
-    """
-    if re.search('.+\(.+-ON-.+\)', course):
-        return course
-    else:
-        return 'Skip'
-
-
 def list_non_on_code(course):
     """Replaces the course name of non-online courses with 'Skip'.
     
@@ -2348,24 +1749,6 @@ def list_non_on_code(course):
         return 'Skip'
 
 
-def list_non_pt(course):
-    """Replaces the course name of non-part-time courses with 'Skip'.
-    
-    Checks for part-time courses by looking for 'PT' in the course name. Those
-    without 'PT' are overwritten with 'Skip'.
-    
-    Args:
-        course (str): Information for course name.
-        
-    Returns:
-        'Skip' if the course is not part-time, the passed course otherwise.
-    """
-    if re.search('.+\(.+-PT-.+\)', course):
-        return course
-    else:
-        return 'Skip'
-
-
 def list_non_pt_code(course):
     """Replaces the course name of non-part-time courses with 'Skip'.
     
@@ -2384,26 +1767,50 @@ def list_non_pt_code(course):
         return 'Skip'
 
 
-def list_non_st(course):
-    """Replaces the course name of non-student courses with 'Skip'.
+def load_cached_data(cache_path):
+    """Return data, and its warnings, saved to the input cache.
     
-    Checks for student courses by looking for '(..-..-..)' in the course name.
-    Those without this are overwritten with 'Skip'.
+    The entry's modified time is updated so that it is kept by
+    evict_input_cache(). An entry that cannot be read (e.g. damaged) is
+    removed so that the file is loaded again.
     
     Args:
-        course (str): Information for course name.
-        
+        cache_path (str): Directory for the file's cache entry.
+    
     Returns:
-        'Skip' if the course is not for students, the passed course otherwise.
+        None if the entry is not in the cache or cannot be read, otherwise:
+        read_data (DataFrame): The data read from the file.
+        True if warnings list has had items appended to it, False otherwise.
+        warnings (list): Warnings that have been identified in the data.
     """
-    if re.search('.+\(.+-.+-.+\)', course):
-        return course
-    else:
-        return 'Skip'
+    meta_name = os.path.join(cache_path, 'meta.json')
+    if not os.path.exists(meta_name):
+        return None
+    try:
+        with open(meta_name) as f:
+            meta = json.load(f)
+        read_data = pd.read_pickle(os.path.join(cache_path, 'data.pkl'))
+        to_add, warnings = meta['to_add'], meta['warnings']
+    except Exception as error:
+        print('\nThe input cache entry could not be read ({}) and has been '
+              'removed'.format(error))
+        shutil.rmtree(cache_path, ignore_errors=True)
+        return None
+    os.utime(cache_path, None)
+    return read_data, to_add, warnings
 
 
 def load_data(source, f_name=''):
     """Read data from a file.
+    
+    Reads the file straight into a DataFrame with the columns from the
+    source's schema (see get_schema()). Values are read as strings, with
+    empty cells as ''. The data is then checked by validate_data(). The loaded
+    data and its warnings are saved to the input cache, so loading the same
+    file again is read from the cache without checking it again. Data that
+    has already been loaded this session is returned from SESSION_DATA; the
+    same DataFrame is returned to each caller, so it must not be changed in
+    place (use assign() or a filtered copy instead).
 
     Args:
         source (str): The code for the table that the source data belongs to.
@@ -2411,122 +1818,51 @@ def load_data(source, f_name=''):
         will be prompted to provide a file name.
 
     Returns:
-        read_data (list): A list containing the data read from the file.
+        read_data (DataFrame): The data read from the file.
         True if warnings list has had items appended to it, False otherwise.
         warnings (list): Warnings that have been identified in the data.
     """
-    warnings = []
+    headings, categories = get_schema(source)
     # Load file
-    if f_name in (None, ''): # Get from user
-        read_data = ft.get_csv_fname_load(source)
-    else:
-        read_data = ft.load_csv(f_name, 'e')
+    if f_name in (None, '') and BATCH['running']: # Get from the job file
+        if source not in BATCH['files']:
+            raise ValueError('No file has been given for {} in the job '
+                             'file'.format(source))
+        f_name = BATCH['files'][source]
+    elif f_name in (None, ''): # Get from user
+        f_name = get_file_name(source)
+    f_name = '{}.csv'.format(f_name)
+    session_key = (source, os.path.abspath(f_name), os.path.getmtime(f_name))
+    if session_key in SESSION_DATA:
+        print('\n{} has already been loaded'.format(f_name))
+        read_data, to_add, warnings = SESSION_DATA[session_key]
+        return read_data, to_add, list(warnings)
+    cache_path = get_cache_path(source, f_name)
+    cached = load_cached_data(cache_path)
+    if cached is not None:
+        print('\n{} loaded from the input cache'.format(f_name))
+        SESSION_DATA[session_key] = cached
+        read_data, to_add, warnings = cached
+        return read_data, to_add, list(warnings)
+    read_data = pd.read_csv(f_name, dtype=str, header=0,
+                            names=headings, usecols=range(len(headings)),
+                            keep_default_na=False)
     # Check that data has entries for each required column
-    if source == 'Active_Students_File_':
-        to_add, items_to_add = check_active_students(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Addresses_':
-        to_add, items_to_add = check_add(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Count_Completions_Report_':
-        to_add, items_to_add = check_ccr(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Count_Students_Tutors_Report_':
-        to_add, items_to_add = check_cst(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Count_Unmarked_Assess_Report_':
-        to_add, items_to_add = check_ua(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Expiry_Report_':
-        to_add, items_to_add = check_expiry_report(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Insightly Tag Data':
-        to_add, items_to_add = check_insightly(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Last_Login_':
-        to_add, items_to_add = check_last_login(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Last Submission Data':
-        to_add, items_to_add = check_last_sub_data(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Last Quiz Data':
-        to_add, items_to_add = check_last_quiz_data(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Never_Logged_In_':
-        to_add, items_to_add = check_never_logged_in(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Not_Logged_In_':
-        to_add, items_to_add = check_not_logged_in(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Previous Tag Data':
-        to_add, items_to_add = check_prev_data(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)           
-    elif source == 'Student Database Tags':
-        to_add, items_to_add = check_tags_data(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Students_File_':
-        to_add, items_to_add = check_students_file(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Submissions_Made_':
-        to_add, items_to_add = check_subs_made(read_data, source)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'Tutor_IDs_':
-        to_add, items_to_add = check_tu(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'User_Completions_Mark_Report_':
-        to_add, items_to_add = check_ucm(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    elif source == 'User_Mark_Tutor_Only_':
-        to_add, items_to_add = check_umt(read_data)
-        if to_add:
-            for item in items_to_add:
-                warnings.append(item)
-    if len(warnings) > 0:
-        return read_data, True, warnings
-    else:
-        return read_data, False, warnings
+    warnings = validate_data(source, read_data)
+    # Store repeated values (e.g. Course) as categoricals
+    for column in categories:
+        read_data[column] = read_data[column].astype('category')
+    to_add = len(warnings) > 0
+    save_cached_data(cache_path, read_data, to_add, warnings)
+    SESSION_DATA[session_key] = (read_data, to_add, warnings)
+    return read_data, to_add, list(warnings)
 
 
 def main():
     repeat = True
+    menu = get_menu()
     low = 1
-    high = 18
+    high = len(menu) + 1
     while repeat:
         try_again = False
         main_message()
@@ -2541,44 +1877,14 @@ def main():
                 print('\nPlease select from the available options ({} - {})'
                       .format(low, high))
                 try_again = True
-            elif action == 1:
-                process_expiry('10_Days_')
-            elif action == 2:
-                process_expiry('1_Month_')
-            elif action == 3:
-                process_expiry('3_Months_')
-            elif action == 4:
-                process_submissions_made_pt('2_Weeks_')
-            elif action == 5:
-                process_submissions_made_on('4_Weeks_')  
-            elif action == 6:
-                process_not_submitted_pt('2_Weeks_')                
-            elif action == 7:
-                process_not_submitted_on('4_Weeks_') 
-            elif action == 8:
-                process_last_login()
-            elif action == 9:
-                process_never_logged_in()
-            elif action == 10:
-                process_not_logged_in_pt('1_Week_')
-            elif action == 11:
-                process_not_logged_in_on('4_Weeks_')
-            elif action == 12:
-                process_completion_mcg()
-            elif action == 13:
-                process_complete_tut()
-            elif action == 14:
-                process_completions_tut()
-            elif action == 15:
-                process_count_ass_unmarked()
-            elif action == 16:
-                process_count_students_tut()
-            elif action == 17:
-                process_insightly_tags()
             elif action == high:
                 print('\nIf you have generated any files, please find them '
                       'saved to disk. Goodbye.')
                 sys.exit()
+            else:
+                label, function, args = menu[action - 1]
+                clear_date_cache()
+                function(*args)
         if not try_again:
             repeat = ad.check_repeat()
     print('\nPlease find your files saved to disk. Goodbye.')
@@ -2586,79 +1892,239 @@ def main():
 
 def main_message():
     """Print the menu of options."""
+    menu = get_menu()
     print('\n\n*************==========================*****************')
     print('\nStudent Report Preparer version 1.0')
     print('Created by Jeff Mitchell, 2018')
-    print('\nOptions:')
-    print('\n1 Prepare Student Expiry Report - 10 Days')
-    print('2 Prepare Student Expiry Report - 1 Month')
-    print('3 Prepare Student Expiry Report - 3 Months')
-    print('4 Prepare Submissions Made Report - 2 Weeks')
-    print('5 Prepare Submissions Made Report - 4 Weeks')
-    print('6 Prepare Students Not Submitted Report - 2 Weeks')
-    print('7 Prepare Students Not Submitted Report - 4 Weeks')
-    print('8 Prepare Last Login Report')
-    print('9 Prepare Never Logged In Report')
-    print('10 Prepare Not Logged In Report - 1 Week')
-    print('11 Prepare Not Logged In Report - 4 Weeks')
-    print('12 Prepare Completion Mark Course Group Report')
-    print('13 Prepare Complete Tutor Only Report')
-    print('14 Prepare Count of Completions Tutor Group Report')
-    print('15 Prepare Count of Unmarked Assessments Report')
-    print('16 Prepare Count of Students Per Tutor Report')
-    print('17 Prepare Insightly Tags Updates Report')
-    print('18 Exit')
-
-
-def merge_tags(list_a, list_b, common):
+    print('\nOptions:\n')
+    for option, (label, function, args) in enumerate(menu, 1):
+        print('{} {}'.format(option, label))
+    print('{} Exit'.format(len(menu) + 1))
+
+
+def match_tags(raw_data):
+    """Return the status and reserved tags found in Contact tag data.
+    
+    Each distinct Contact tag string is lower-cased and searched once with
+    TAG_MATCHER, so repeated strings are not searched again.
+    
+    Args:
+        raw_data (Series): Contact tag data for each student.
+    
+    Returns:
+        codes (array): Position of each student's tag string in uniques (-1
+        for missing values).
+        uniques (Index): Distinct Contact tag strings.
+        matches (Series): Tags found, one per row, indexed by position in
+        uniques.
+    """
+    codes, uniques = pd.factorize(raw_data)
+    found = pd.Series(uniques, dtype=object).str.lower().str.findall(
+            TAG_MATCHER)
+    matches = found.explode().dropna()
+    return codes, uniques, matches
+
+
+def merge_first_match(left_df, right_df, key, columns):
+    """Return left_df with columns added from the first match in right_df.
+    
+    Each row of left_df is joined to the first row of right_df that has the
+    same key. Rows of left_df without a match are dropped and their keys are
+    returned so that they can be reported.
+    
+    Args:
+        left_df (DataFrame): Data to have the columns added.
+        right_df (DataFrame): Data to take the columns from.
+        key (str): Name of the column to match on.
+        columns (list): Names of the columns in right_df to be added.
+    
+    Returns:
+        merged (DataFrame): Matched rows of left_df with columns added.
+        unmatched (list): Keys in left_df without a match in right_df.
+    """
+    first = right_df.drop_duplicates(subset=key)[[key] + columns]
+    merged = pd.merge(left_df, first, on=key, how='left', indicator=True)
+    found = merged['_merge'] == 'both'
+    unmatched = merged.loc[~found, key].tolist()
+    merged = merged[found].drop(columns='_merge')
+    return merged, unmatched
+
+
+def merge_tags(this_month, prev_month, headings):
     """Return students with tag info for further analysis.
     
-    Returns a list with each student that appears in both lists. Appends the
-    tag for each student from each list to the student. Also appends a value
-    based on each tag which is used in a later function to determine if the
-    student has progressed or regressed.
+    Joins the two months on Student ID, keeping each student that appears in
+    both. The first entry for a student in each month is used. Adds the tag
+    from each month as Current_Tag and Previous_Tag and drops students that
+    do not have a colour tag (Green, Orange, Red, Black) in both months.
     
     Args:
-        list_a (list): Current month student data.
-        list_b (list): Previous month student data.
-        common (list): Student IDs appearing in both lists.
+        this_month (DataFrame): Current month student data.
+        prev_month (DataFrame): Previous month student data.
+        headings (list): sid_name, eid_name, stud_name, course_name,
+        tutor_name, new_tags_name.
     
     Returns:
-        students (list): Updated student tags information.
-        
-    File structure (list_x):
-        StudentID, EnrolmentID, Student, Course, Tutor, Updated_Tags.
+        students (DataFrame): StudentID, EnrolmentID, Student, Course, Tutor,
+        Current_Tag, Previous_Tag.
     """
-    allowed = ['Green', 'Orange', 'Red', 'Black']
-    students = []
-    for student in common:
-        this_student = []
-        this_student.append(student)
-        for student_a in list_a:
-            # print('Student a: {}'.format(student_a[0]))
-            if student == student_a[0]:
-                # print('Student found')
-                # Add data from list_a
-                i = 1
-                while i < 6:
-                    this_student.append(student_a[i])
-                    i += 1
-                # Add tag from list_b
-                for student_b in list_b:
-                    if student == student_b[0]:
-                        this_student.append(student_b[5])
-                        break
-                break
-        students.append(this_student)
+    current = this_month.drop_duplicates(subset=headings[0])[headings]
+    current = current.rename(columns={headings[5]: 'Current_Tag'})
+    previous = prev_month.drop_duplicates(subset=headings[0])
+    previous = previous[[headings[0], headings[5]]].rename(
+            columns={headings[5]: 'Previous_Tag'})
+    students = pd.merge(current, previous, on=headings[0], how='inner')
     # Remove students that do not have an allowed tag
-    for student in students:
-        if student[5] not in allowed or student[6] not in allowed:
-            students.remove(student)      
-    # Add values for tags
-    students = get_tags_values(students)
+    allowed = ((get_tag_codes(students['Current_Tag']) >= 0) &
+               (get_tag_codes(students['Previous_Tag']) >= 0))
+    students = students[allowed]
     return students    
 
 
+def normalise_dates(dates, sep='/', nil_null=True):
+    """Return a column of dates as datetimes and as display strings.
+    
+    Each distinct value is handled once and the results are broadcast back
+    to every row. The format of the column is found from its first date (the
+    part before any time) and the dates are then parsed with that format
+    using parse_dates(). Columns in an unknown format are parsed day first.
+    Values that cannot be read are kept as they are in the display strings.
+    
+    Args:
+        dates (Series): Dates or timestamps as strings.
+        sep (str): (Optional) Separator for the display strings.
+        nil_null (bool): (Optional) Treat 01/01/1970 as no date.
+    
+    Returns:
+        parsed (Series): Datetime for each date, NaT where there is none.
+        display (Series): Each date as DD/MM/YYYY using sep, '' where there
+        is none.
+    """
+    dates = pd.Series(dates, dtype=object)
+    codes, uniques = pd.factorize(dates.fillna(''))
+    raw = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    date_part = raw.str.split(' ').str[0]
+    sample = date_part[date_part != '']
+    date_format = None
+    if len(sample.index) > 0:
+        for pattern, fmt in DATE_FORMATS:
+            if pattern.match(sample.iloc[0]):
+                date_format = fmt
+                break
+    unique_parsed = parse_dates(date_part, date_format, len(codes))
+    unique_display = unique_parsed.dt.strftime('%d{0}%m{0}%Y'.format(sep))
+    # Keep values that could not be read
+    unique_display = unique_display.where(unique_parsed.notnull(), raw)
+    if nil_null:
+        nil = unique_parsed == NIL_DATE
+        unique_parsed = unique_parsed.where(~nil)
+        unique_display = unique_display.where(~nil, '')
+    parsed = pd.Series(unique_parsed.values.take(codes), index=dates.index)
+    display = pd.Series(unique_display.values.take(codes), index=dates.index)
+    return parsed, display
+
+
+def parse_course(course):
+    """Return the course code and delivery mode of a course name.
+    
+    Student courses have the course code in brackets at the end of the name
+    (XXX-XX-XXX). Part-time courses have 'PT' and online courses 'ON' in the
+    middle of the code.
+    
+    Args:
+        course (str): Full course name.
+    
+    Returns:
+        code (str): Course code, 'Skip' if a course code cannot be found.
+        mode (str): 'PT', 'ON', 'Other' or 'Non-student'.
+    """
+    if not STUDENT_COURSE.search(course):
+        return 'Skip', 'Non-student'
+    start = course.index('(')
+    code = course[start+1:-1]
+    if PT_COURSE.search(course):
+        return code, 'PT'
+    elif ON_COURSE.search(course):
+        return code, 'ON'
+    else:
+        return code, 'Other'
+
+
+def parse_dates(dates, date_format=None, rows=None):
+    """Return datetimes for a column of date strings.
+    
+    Each distinct date string is parsed once and kept in DATE_CACHE, so dates
+    repeated within a column or seen in an earlier column of the report are
+    not parsed again. The counts are added to DATE_STATS.
+    
+    Args:
+        dates (Series): Date strings.
+        date_format (str): (Optional) strptime format of the dates. Dates are
+        parsed day first if no format is given.
+        rows (int): (Optional) Number of rows the dates were taken from, when
+        dates holds the distinct values of a column. Defaults to the length
+        of dates.
+    
+    Returns:
+        parsed (Series): Datetime for each date, NaT where it cannot be read.
+    """
+    dates = pd.Series(dates, dtype=object)
+    codes, uniques = pd.factorize(dates)
+    unseen = [date for date in uniques if (date_format, date) not in
+              DATE_CACHE]
+    if unseen:
+        if date_format is not None:
+            new_dates = pd.to_datetime(pd.Series(unseen), format=date_format,
+                                       errors='coerce')
+        else:
+            new_dates = pd.to_datetime(pd.Series(unseen), dayfirst=True,
+                                       errors='coerce')
+        for date, parsed_date in zip(unseen, new_dates):
+            DATE_CACHE[(date_format, date)] = parsed_date
+    DATE_STATS['rows'] += len(codes) if rows is None else rows
+    DATE_STATS['distinct'] += len(uniques)
+    DATE_STATS['parsed'] += len(unseen)
+    # Broadcast back to every row (-1 for missing values gives NaT)
+    values = pd.to_datetime(pd.Series([DATE_CACHE[(date_format, date)] for
+                                       date in uniques], dtype=object))
+    parsed = pd.Series(values.reindex(codes).values, index=dates.index)
+    return parsed
+
+
+def preload_inputs(files):
+    """Load each of the batch's input files into the input cache.
+    
+    Done before the jobs are started so that each file is read and checked
+    once. Each job's process then gets the data from the input cache (or,
+    where processes are forked, from the main process's SESSION_DATA)
+    rather than reading and checking the file itself. A file that cannot be
+    loaded is left for the job that needs it to report.
+    
+    Args:
+        files (set): (source, file name) for each input file of the batch.
+    """
+    print('\nLoading input files')
+    for source, f_name in sorted(files):
+        try:
+            load_data(source, f_name)
+        except (Exception, SystemExit) as error:
+            print('\n{}.csv could not be loaded ({})'.format(f_name, error))
+    print('\rFinished loading input files')
+
+
+def print_date_stats():
+    """Print the number of dates read and parsed for the report.
+    
+    Dates that did not need parsing were either repeats within a column or
+    already in DATE_CACHE.
+    """
+    rows = DATE_STATS['rows']
+    if rows:
+        print('\nDates: {} read, {} distinct, {} parsed ({}% from cache)'
+              .format(rows, DATE_STATS['distinct'], DATE_STATS['parsed'],
+                      round((1 - DATE_STATS['parsed'] / rows) * 100, 1)))
+
+
 def process_complete_tut():
     """Prepares Users marked by tutor only report.
     
@@ -2675,25 +2141,20 @@ def process_complete_tut():
     print('\nProcessing Users marked tutor only Report data.')
     # Confirm the required files are in place
     required_files = ['Users marked tutor only Report']
-    ad.confirm_files('Users marked tutor only Report', required_files)
+    confirm_files('Users marked tutor only Report', required_files)
     # Get name for 'Users marked tutor only' Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('User_Mark_Tutor_Only_'
-                                                     'Report_')
+    comp, to_add, warnings_to_add = load_data('User_Mark_Tutor_Only_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(comp)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Course', 'Tutor group', 'Student ID', 'Student', 'Tutor',
-                'Head Tutor', 'Manager']
-    comp = pd.DataFrame(data = report_data, columns = headings)
     f_name = 'Users_Mark_Tutor_Only_All_{}.xls'.format(
-            ft.generate_time_string())
+            get_time_string())
     comp.to_excel(f_name, index=False)
     print('\nUsers_Mark_Tutor_Only_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    process_warning_log(warnings, warnings_to_process)
     
 
 def process_completion_mcg():
@@ -2713,30 +2174,23 @@ def process_completion_mcg():
     print('\nProcessing User completions mark Report data.')
     # Confirm the required files are in place
     required_files = ['User completions mark Report']
-    ad.confirm_files('User completions mark Report', required_files)
+    confirm_files('User completions mark Report', required_files)
     # Get name for 'User completions mark Report' Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('User_Completions_Mark_'
-                                                     'Report_')
+    comp, to_add, warnings_to_add = load_data('User_Completions_Mark_Report_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(comp)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Course', 'Tutor group', 'Student ID', 'Student', 'Tutor',
-                'Head Tutor', 'Manager']
-    comp = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not a student course
-    comp['Course'] = comp['Course'].apply(list_non_st)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    comp = comp.drop(comp.index[comp['Course'] == 'Skip'])   
+    # Remove courses that are not student courses
+    comp = comp[get_courses(comp['Course'])[1] != 'Non-student']
     # Save Master file
     f_name = 'User_Completions_Mark_All_{}.xls'.format(
-            ft.generate_time_string())
+            get_time_string())
     comp.to_excel(f_name, index=False)
     print('\nUser_Completions_Mark_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_completions_tut():
@@ -2756,31 +2210,30 @@ def process_completions_tut():
     print('\nCount of completions Report data.')
     # Confirm the required files are in place
     required_files = ['Count of completions Report']
-    ad.confirm_files('Count of completions Report', required_files)
+    confirm_files('Count of completions Report', required_files)
     # Get name for 'Count of completions Report' Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Count_Completions_'
-                                                     'Report_')
+    comp, to_add, warnings_to_add = load_data('Count_Completions_Report_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(comp)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Course', 'Tutor', 'Completions']
-    comp = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not a Part-time course
-    comp['Course'] = comp['Course'].apply(list_non_pt)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    comp = comp.drop(comp.index[comp['Course'] == 'Skip'])
+    # Remove courses that are not Part-time courses
+    comp = comp[get_courses(comp['Course'])[1] == 'PT']
     # Convert the Completions column to integers
-    comp['Completions'] = comp['Completions'].apply(ad.convert_to_int)
+    counts, bad_counts = convert_counts(comp, 'Completions',
+                                        ['Course', 'Tutor'])
+    comp = comp.assign(**{'Completions': counts})
+    for line in bad_counts:
+        warnings_to_process = True
+        warnings.append(line)
     # Save Master file
     f_name = 'Count_Completions_Report_All_{}.xls'.format(
-            ft.generate_time_string())
+            get_time_string())
     comp.to_excel(f_name, index=False)
     print('\nCount_Completions_Report_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_count_ass_marked():
@@ -2804,29 +2257,29 @@ def process_count_ass_unmarked():
     print('\nCount of unmarked assessments per tutor Report data.')
     # Confirm the required files are in place
     required_files = ['Count of unmarked assessments per tutor Report']
-    ad.confirm_files('Count of unmarked assessments per tutor Report',
+    confirm_files('Count of unmarked assessments per tutor Report',
                   required_files)
     # Get name for 'Count of umarked... Report' Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Count_Unmarked_Asses_'
-                                                     'Report_')
+    comp, to_add, warnings_to_add = load_data('Count_Unmarked_Assess_Report_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(comp)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Course', 'Tutor', 'Number assessments']
-    comp = pd.DataFrame(data = report_data, columns = headings)
-    # Convert the Number Students column to integers
-    comp['Number assessments'] = comp['Number assessments'].apply(
-            ad.convert_to_int)
+    # Convert the Number assessments column to integers
+    counts, bad_counts = convert_counts(comp, 'Number assessments',
+                                        ['Course', 'Tutor'])
+    comp = comp.assign(**{'Number assessments': counts})
+    for line in bad_counts:
+        warnings_to_process = True
+        warnings.append(line)
     # Save Master file
     f_name_1 = 'Count_Unmarked_Assessments_Report_All_'
-    f_name = '{}{}.xls'.format(f_name_1, ft.generate_time_string())
+    f_name = '{}{}.xls'.format(f_name_1, get_time_string())
     comp.to_excel(f_name, index=False)
     print('\n{} has been saved to {}'.format(f_name_1, f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_count_students_tut():
@@ -2844,37 +2297,40 @@ def process_count_students_tut():
     print('\nCount of students in tutor group Report data.')
     # Confirm the required files are in place
     required_files = ['Count of students in tutor group Report']
-    ad.confirm_files('Count of students in tutor group Report', required_files)
+    confirm_files('Count of students in tutor group Report', required_files)
     # Get name for 'Count of students... Report' Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Count_Students_Tutors_'
-                                                     'Report_')
+    comp, to_add, warnings_to_add = load_data('Count_Students_Tutors_Report_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(comp)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Course', 'Tutor', 'Number Students']
-    comp = pd.DataFrame(data = report_data, columns = headings)
     # Convert the Number Students column to integers
-    comp['Number Students'] = comp['Number Students'].apply(ad.convert_to_int)
+    counts, bad_counts = convert_counts(comp, 'Number Students',
+                                        ['Course', 'Tutor'])
+    comp = comp.assign(**{'Number Students': counts})
+    for line in bad_counts:
+        warnings_to_process = True
+        warnings.append(line)
     # Save Master file
     f_name_1 = 'Count_Students_Tutor_Report_All_'
-    f_name = '{}{}.xls'.format(f_name_1, ft.generate_time_string())
+    f_name = '{}{}.xls'.format(f_name_1, get_time_string())
     comp.to_excel(f_name, index=False)
     print('\n{} has been saved to {}'.format(f_name_1, f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_expiry(period):
     """Process expiry report.
 
     Process a report for the students that are expiring. Adds to the report the
-    student's address details from the student database.
+    student's address details from the student database. The Expiry Dates are
+    read once and a report is saved for each period requested.
     
     Args:
-        period (str): Period report covers. Used for save file name.
+        period (str): Period report covers (a key of EXPIRY_PERIODS), or 'All'
+        for a report for each period. Used for save file name.
     
     File Structure (Expiry report):
         Student ID, Student, Email, Course, Expiry Date
@@ -2892,55 +2348,60 @@ def process_expiry(period):
     warnings = ['\nProcessing Expiry Report data Warnings:\n']
     warnings_to_process = False
     print('\nExpiry Report data.')
+    if period == 'All':
+        periods = list(EXPIRY_PERIODS)
+    else:
+        periods = [period]
     # Confirm the required files are in place
     required_files = ['Expiry Report', 'Addresses File']
-    ad.confirm_files('Expiry Report', required_files)
+    confirm_files('Expiry Report', required_files)
     # Get name for Expiry Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Expiry_Report_')
+    expiry, to_add, warnings_to_add = load_data('Expiry_Report_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(expiry)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Get name for Addresses data file and then load
-    address_data, to_add, warnings_to_add = load_data('Addresses_')
+    addresses, to_add, warnings_to_add = load_data('Addresses_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the address data
-    headings = ['Student ID', 'Number', 'Street', 'Suburb', 'City', 'Postcode',
-                'Country']
-    addresses = pd.DataFrame(data = address_data, columns = headings)
-    # Create a dataframe with the report data
-    headings = ['Student ID', 'Student', 'Email', 'Course',
-                'Expiry Date']
-    expiry = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in 'Expiry Date' if student has expired
-    expiry['Expiry Date'] = expiry['Expiry Date'].apply(list_expired)
-    # Remove students that have already expired ('Expired' in 'Expiry Date')
-    expiry = expiry.drop(expiry.index[expiry['Expiry Date'] == 'Expired'])
-    # Convert Expiry date to DD-MM-YYYY
-    expiry['Expiry Date'] = expiry['Expiry Date'].apply(da.clean_date,
-          args=('-','-',''))
+    # Read the Expiry Dates and convert them to DD-MM-YYYY. 01-01-1970 is kept
+    # as a date so that it counts as expired
+    expiry_dates, display_dates = normalise_dates(expiry['Expiry Date'], '-',
+                                                  False)
+    expiry = expiry.assign(**{'Expiry Date': display_dates})
+    # Find the students expiring in each period, leaving out those that have
+    # already expired
+    windows = get_expiry_windows(expiry_dates)
     # Merge the two dataframes so that address information is incorporated
-    updated_expiry = pd.merge(expiry, addresses, on = 'Student ID',
-                              how = 'left')
-    # Save Master file
-    f_name = 'Expiry_Report_{}{}.xls'.format(period, ft.generate_time_string())
-    updated_expiry.to_excel(f_name, index=False)
-    print('\nExpiry_Report_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
-
-
-def process_insightly_tags():
+    for period in periods:
+        updated_expiry = pd.merge(expiry[windows[period]], addresses,
+                                  on = 'Student ID', how = 'left')
+        # Save Master file
+        f_name = 'Expiry_Report_{}{}.xls'.format(period,
+                                get_time_string())
+        updated_expiry.to_excel(f_name, index=False)
+        print('\nExpiry_Report_{} has been saved to {}'.format(period,
+              f_name))
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
+
+
+def process_insightly_tags(thresholds=None):
     """Process Insightly Tags updates report.
     
     Process the Insightly Tags based on student submission reports. Generates
     a report of all active student's status tags and a second report that lists
     all of the tags that need to be changed.
     
+    Args:
+        thresholds (dict): (Optional) Days for each tag zone for this run.
+        Defaults to TAG_THRESHOLDS.
+    
     File Structure (Student Database Tags):
         EnrolmentPK, StudentID, NameGiven, NameSurname, CourseFK, TutorFK,
         Status, Tag, StartDate.
@@ -2985,7 +2446,7 @@ def process_insightly_tags():
     required_files = ['Student Database Tags', 'Tutor IDs File', 
                       'Last Quiz File', 'Last Submission File',
                       'Insightly Tags Data', 'Last Month Tags']
-    ad.confirm_files('Insightly Tags Report', required_files)
+    confirm_files('Insightly Tags Report', required_files)
     # Variables for column names
     cid_name  = 'Course ID'
     course_name = 'Course'
@@ -2999,74 +2460,64 @@ def process_insightly_tags():
     tag_name = 'Tag'
     tid_name  = 'Tutor ID'
     tutor_name = 'Tutor'
-    # Load Tutor_Id.csv
-    tutors_data, to_add, warnings_to_add = load_data('Tutor_IDs_', 'Tutor_IDs')
+    # Load Tutor_IDs.csv, or the Tutor IDs file given in a batch job file
+    tutors, to_add, warnings_to_add = load_data(
+            'Tutor_IDs_', BATCH['files'].get('Tutor_IDs_', 'Tutor_IDs'))
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a DataFrame for the Tutor IDs data
     headings = [tid_name, fname_name, lname_name]
-    tutors = pd.DataFrame(data = tutors_data, columns = headings)
     # Create a list of Tutor ID's
     tutor_ids = tutors[tid_name].unique()
+    # Create a dictionary of Tutor names to be shared by the lookups below
+    tutor_dict = get_tutor_dict(tutors, headings)
     # Get name for the Student Database Tags data file and then load
-    sd_data, to_add, warnings_to_add = load_data('Student Database Tags')
+    sd_df, to_add, warnings_to_add = load_data('Student Database Tags')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Go through tutor ids in database data and make sure present in tutor data
-    check_tutor_ids(tutor_ids, sd_data)
-    # Create a DataFrame for the Student Database Tags data
-    headings = [eid_name, sid_name, fname_name, lname_name, cid_name, tid_name,
-                status_name, tag_name, sdate_name]
-    sd_df = pd.DataFrame(data = sd_data, columns = headings)
+    check_tutor_ids(tutor_ids, sd_df)
     # Convert Start Dates to "DD/MM/YYYY"
-    sd_df[sdate_name] = sd_df[sdate_name].apply(da.clean_date)
+    sd_df = sd_df.assign(**{sdate_name: normalise_dates(sd_df[sdate_name])[1]})
     # Get name for the Insightly Tags data file and then load
-    id_data, to_add, warnings_to_add = load_data('Insightly Tag Data')
+    id_df, to_add, warnings_to_add = load_data('Insightly Tag Data')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Clean Insightly Tag data
-    id_clean = clean_insightly(id_data)
-    # Create DataFrame for Insightly Data
-    headings = [sid_name, fname_name, lname_name, tag_name]
-    id_df = pd.DataFrame(data = id_clean, columns = headings)
+    id_df = clean_insightly(id_df)
     # Extract Insightly Tag info (status tag)
     # Find status tag and save to column
-    id_df[tag_name] = id_df[tag_name].apply(extract_tag)
+    id_df[tag_name] = extract_tag(id_df[tag_name])
     headings = [sid_name, tag_name]
     id_df = id_df[headings]
-    # Load Tutor_Id.csv
-    tutors_data, to_add, warnings_to_add = load_data('Tutor_IDs_', 'Tutor_IDs')
-    if to_add:
-        warnings_to_process = True
-        for line in warnings_to_add:
-            warnings.append(line)
-    # Create a DataFrame for the Tutor IDs data
-    headings = [tid_name, fname_name, lname_name]
-    tutors = pd.DataFrame(data = tutors_data, columns = headings)
     # Load Last submission date information
-    lsd_data, to_add, warnings_to_add = load_data('Last Submission Data')
+    lsd_df, to_add, warnings_to_add = load_data('Last Submission Data')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # ad.debug_list(lsd_data)
+    # print(lsd_df)
     # Clean Last submissions data
-    lsd_clean = clean_last_subs_date(lsd_data)
+    lsd_clean = clean_last_subs_date(lsd_df)
     # Load Last quiz date information
-    lqd_data, to_add, warning_to_add = load_data('Last Quiz Data')
+    lqd_df, to_add, warnings_to_add = load_data('Last Quiz Data')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    lqd_clean = clean_last_quiz_date(lqd_data)
+    lqd_clean = clean_last_quiz_date(lqd_df)
     # print(lqd_clean)
     print('\nNow processing the data. Please wait...')
+    # Count days for tag zones from the same date for every student
+    ref_date = pd.Timestamp.now().normalize()
+    # Index student details (name, course, tutor name) by Student ID
+    s_index = get_student_index(sd_df, tutor_dict, fname_name, lname_name,
+                                tid_name, sid_name, cid_name)
     # ----------------------------------------------------------------------
     # Filter out inactive students so not included in enrolment date check
     # ----------------------------------------------------------------------
@@ -3076,7 +2527,8 @@ def process_insightly_tags():
     combined_subs = combine_sub_data(lsd_clean, lqd_clean)
     # Rename tags below
     # Convert Enrolment Date to a Status Tag - only for Active students
-    combined_tags = convert_e_date(combined_subs, sd_df_students)    
+    combined_tags = convert_e_date(combined_subs, sd_df_students, thresholds,
+                                   ref_date)
     # Get a list of students in combined_tags
     combined_tags_students = get_tags_students(combined_tags, sd_df_students,
                                                0)
@@ -3084,12 +2536,10 @@ def process_insightly_tags():
     missing_students = find_missing(sd_df_students, combined_tags_students)
     # Add missing active students and their details to the combined_tags data
     # Set tag to 'Black' as have not submitted and zones will correct
-    combined_tags = add_missing(combined_tags, sd_df, tutors, missing_students,
-                           fname_name, lname_name, tid_name, sid_name,
-                           cid_name)
+    combined_tags = add_missing(combined_tags, s_index, missing_students)
     # Create Tag Zone lists (Max tag a student can have based on enrolment)
     en_dates = get_enrol_dates(sd_df, sid_name, sdate_name, sd_df_students)
-    black, red, orange, green = get_colour(en_dates)
+    black, red, orange, green = get_colour(en_dates, thresholds, ref_date)
     # Create a list to hold StudentID, sub_tag, zone
     student_tags = get_tags(combined_tags, black, red, orange, green)
     # Determine Tag for each student
@@ -3107,28 +2557,48 @@ def process_insightly_tags():
     headings = [sid_name, new_tags_name]
     tags_df = pd.DataFrame(data = new_tags, columns = headings)
     # Add Enrolment ID
-    tags_df = add_eid(tags_df, sd_df, sid_name, eid_name, new_tags_name)
+    tags_df, no_match = add_eid(tags_df, sd_df, sid_name, eid_name,
+                                new_tags_name)
     # Add Student Details
     headings = [sid_name, eid_name, stud_name, course_name, tutor_name,
                 new_tags_name]
     headings_sd_df = [eid_name, sid_name, fname_name, lname_name, cid_name,
                       tid_name, status_name, tag_name, sdate_name]
-    tags_df = add_stud(tags_df, sd_df, headings, headings_sd_df)
+    tags_df, no_details = add_stud(tags_df, sd_df, headings, headings_sd_df)
+    # Record students that could not be matched to the Student Database
+    for student in no_match + no_details:
+        warnings_to_process = True
+        warnings.append('Student ID {} could not be found in the Student '
+                        'Database Tags data and has been left out of '
+                        'Updated_Tags'.format(student))
     # Replace Tutor ID with Tutor Name
-    headings = [tid_name, fname_name, lname_name]
-    tags_df[tid_name] = tags_df[tid_name].apply(replace_single_tutor_name,
-           args=(tutors, headings))
+    tags_df[tid_name], unknown_tutors = replace_tutor_ids(tags_df[tid_name],
+                                                         tutor_dict)
+    for tutor_id in unknown_tutors:
+        warnings_to_process = True
+        warnings.append('Tutor ID {} is not in the Tutor IDs file and has not '
+                        'been replaced with a Tutor name'.format(tutor_id))
     # Rename Tutor ID column to Tutor
     tags_df = tags_df.rename(columns={tid_name:tutor_name})
     # Sort by Tutor and then Student
     tags_df = tags_df.sort_values([tutor_name, stud_name])
     # Save the updated tags information - record of current tags
-    f_name = 'Updated_Tags_{}.xls'.format(ft.generate_time_string())
+    f_name = 'Updated_Tags_{}.xls'.format(get_time_string())
     tags_df.to_excel(f_name, index=False)
-    # Save as CSV to be opened for comparison analysis
-    ut_name = 'Updated_Tags_{}.csv'.format(ft.generate_time_string())
-    tags_df.to_csv(ut_name, index=False)
     print('\nUpdated_Tags has been saved to {}'.format(f_name))
+    # Keep this month's tags for the comparison analysis
+    this_month = tags_df
+    # Add this month's tags to the tag history store
+    headings = [sid_name, eid_name, stud_name, cid_name, tutor_name,
+                new_tags_name]
+    run_date = dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    save_tag_history(this_month, headings, run_date)
+    print('\nUpdated_Tags has been added to {}'.format(TAG_HISTORY_DB))
+    # Archive as CSV (next month's Last Month Tags) in the background
+    ut_name = 'Updated_Tags_{}.csv'.format(get_time_string())
+    archive_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    archive = archive_pool.submit(tags_df.to_csv, ut_name, index=False)
+    archive_pool.shutdown(wait=False)
     print('\nAnalysing changes to tags in Student Database.')
     # Check for changes made to tags from sd_data
     headings = [sid_name, eid_name, stud_name, new_tags_name]
@@ -3137,7 +2607,7 @@ def process_insightly_tags():
     # print(sd_changed)
     # Save the changed tags information - Student Database tags to update
     f_name = 'Changed_Tags_Student_Database_{}.xls'.format(
-            ft.generate_time_string())
+            get_time_string())
     sd_changed.to_excel(f_name, index=False)
     print('\nChanged_Tags_Student_Database_ has been saved to {}'.format(
             f_name))
@@ -3147,71 +2617,49 @@ def process_insightly_tags():
     # Get a list of student ID in tags_df
     tags_df_students = get_students(tags_df, sid_name)
     # Get tutor name for each student in list and add it
-    tags_df_students = add_tutor(tags_df_students, sd_df, tutors, fname_name,
-                                 lname_name, tid_name, sid_name)
+    tags_df_students = add_tutor(tags_df_students, s_index)
     # Add Tutor column to tags_df and add the tutor name for each student
     tags_df = add_tutor_df(tags_df, tags_df_students, headings)
     id_changed = get_id_changes(tags_df, id_df, headings, tag_name)
     id_changed = id_changed.sort_values([tutor_name, stud_name])
     # print(id_changed)
     # Save the changed tags information - Insightly tags to update
-    f_name = 'Changed_Tags_Insightly_{}.xls'.format(ft.generate_time_string())
+    f_name = 'Changed_Tags_Insightly_{}.xls'.format(get_time_string())
     id_changed.to_excel(f_name, index=False)
     print('\nChanged_Tags_Insightly_ has been saved to {}'.format(f_name))
     print('\nCounting number of tags per tutor.')
     # Count the number of tags per colour per tutor
     headings = [sid_name, eid_name, stud_name, course_name, tutor_name,
                 new_tags_name]
-    # Get Dictionary with the tags count information
-    tags_tutor, tags_list = tags_count(tags_df, headings)
-    # Extract Dictionary items into a list
-    tag_count = get_tutor_tags(tags_tutor, tags_list)
-    headings = ['Tutor', tags_list[0], tags_list[1], tags_list[2], 
-                tags_list[3], tags_list[4]]
-    # Create a DataFrame for Tutor tags count
-    tags_tutor_df = pd.DataFrame(data=tag_count, columns = headings)
-    # Rename empty Tutor cell
-    tags_tutor_df['Tutor'] = tags_tutor_df['Tutor'].apply(rename_tutor)
-    # Add a Total row
-    tags_tutor_df = tags_tutor_df.append(tags_tutor_df.sum(numeric_only=True),
-                         ignore_index=True)
-    num_rows = tags_tutor_df.shape[0] - 1
-    tags_tutor_df.loc[num_rows, 'Tutor'] = 'Total'
+    # Get DataFrame with the tags count information and Total row
+    tags_tutor_df = tags_count(tags_df, headings)
     # Save the Count of Tags by Tutor
-    f_name = 'Tags_Count_{}.xls'.format(ft.generate_time_string())
+    f_name = 'Tags_Count_{}.xls'.format(get_time_string())
     tags_tutor_df.to_excel(f_name, index=False)
     print('\nTags_Count_ has been saved to {}'.format(f_name))
     print('\nAnalysing Student changes.')
     # Get count of students that have regressed and progressed
     # Load previous month's tags
-    prev_data, to_add, warnings_to_add = load_data('Previous Tag Data')
+    prev_df, to_add, warnings_to_add = load_data('Previous Tag Data')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Load Updated Tags for this month (processed earlier) into a list
-    ut_name = ut_name[:-4] # Remove .csv from file name
-    print('\nLoading {}...'.format(ut_name))
-    this_data, to_add, warnings_to_add = load_data('Previous Tag Data',
-                                                   ut_name)
-    print('\nLoaded {}.'.format(ut_name))
-    # ad.debug_list(this_data)
-    # Get Dictionary with counts for each tutor
-    tutor_stats, change_list = get_tutor_stats(prev_data, this_data)
-    # Extract Dictionary items into a list
-    change_count = get_tutor_changes(tutor_stats, change_list)
-    # Create a DataFrame
-    headings = ['Tutor', 'Progressed', 'Regressed', 'Maintained']
-    change_count_df = pd.DataFrame(data = change_count, columns = headings)
-    change_count_df = change_count_df.append(
-            change_count_df.sum(numeric_only=True), ignore_index=True)
-    change_count_df['Tutor'] = change_count_df['Tutor'].apply(rename_tutor)
-    num_rows = change_count_df.shape[0] - 1
-    change_count_df.loc[num_rows, 'Tutor'] = 'Total'
-    f_name = 'Tags_Changes_{}.xls'.format(ft.generate_time_string())
+    # Get DataFrame with counts for each tutor (Updated_Tags holds Course ID)
+    headings = [sid_name, eid_name, stud_name, cid_name, tutor_name,
+                new_tags_name]
+    change_count_df = get_tutor_stats(prev_df, this_month, headings)
+    # Rename empty Tutor cell and add a Total row
+    change_count_df['Tutor'] = rename_tutor(change_count_df['Tutor'])
+    change_count_df = add_total_row(change_count_df, 'Tutor')
+    f_name = 'Tags_Changes_{}.xls'.format(get_time_string())
     change_count_df.to_excel(f_name, index=False)
     print('\nTags_Changes has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    # Wait for the Updated_Tags archive, raising any error from writing it
+    archive.result()
+    print('\nUpdated_Tags has been archived to {}'.format(ut_name))
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_last_login():
@@ -3230,28 +2678,23 @@ def process_last_login():
     print('\nProcessing Last Login data.')
     # Confirm the required files are in place
     required_files = ['Last Login Report']
-    ad.confirm_files('Last Login Report', required_files)
+    confirm_files('Last Login Report', required_files)
     # Get name for Last Login Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Last_Login_')
+    last_logged, to_add, warnings_to_add = load_data('Last_Login_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Student ID', 'Student', 'Tutor', 'Course', 'Last Access',
-                'Email']
-    last_logged = pd.DataFrame(data = report_data, columns = headings)
     last_col = 'Last Access'
-    # Convert timestamps to dates (strings)
-    last_logged[last_col] = last_logged[last_col].apply(da.clean_date,
-               args=('-','-',''))
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    last_logged[last_col] = last_logged[last_col].apply(da.replace_nil_date)
+    # Convert timestamps to dates (strings), 01-01-1970 becomes empty
+    last_logged = last_logged.assign(**{last_col: normalise_dates(
+            last_logged[last_col], '-')[1]})
     # Save Master file
-    f_name = 'Last_Login_All_{}.xls'.format(ft.generate_time_string())
+    f_name = 'Last_Login_All_{}.xls'.format(get_time_string())
     last_logged.to_excel(f_name, index=False)
     print('\nLast_Login_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_never_logged_in():
@@ -3272,27 +2715,25 @@ def process_never_logged_in():
     print('\nProcessing Never Logged In data.')
     # Confirm the required files are in place
     required_files = ['Never Logged In Report']
-    ad.confirm_files('Never Logged In Report', required_files)
+    confirm_files('Never Logged In Report', required_files)
     # Get name for Never Logged In Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Never_Logged_In_')
+    not_logged, to_add, warnings_to_add = load_data('Never_Logged_In_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Student ID', 'Student', 'Tutor', 'Course', 'Account Created',
-                'Report Date', 'Email']
-    not_logged = pd.DataFrame(data = report_data, columns = headings)
     # Convert timestamps to dates (strings)
-    not_logged['Account Created'] = not_logged['Account Created'].apply(
-            da.clean_date, args=('-','-',''))
-    not_logged['Report Date'] = not_logged['Report Date'].apply(da.clean_date,
-              args=('-','-',''))
+    not_logged = not_logged.assign(**{
+            'Account Created': normalise_dates(not_logged['Account Created'],
+                                               '-', False)[1],
+            'Report Date': normalise_dates(not_logged['Report Date'], '-',
+                                           False)[1]})
     # Save Master file
-    f_name = 'Never_Logged_In_All_{}.xls'.format(ft.generate_time_string())
+    f_name = 'Never_Logged_In_All_{}.xls'.format(get_time_string())
     not_logged.to_excel(f_name, index=False)
     print('\nNever_Logged_In_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
     
 
 def process_not_logged_in_on(period):
@@ -3315,32 +2756,26 @@ def process_not_logged_in_on(period):
     print('\nProcessing Not Logged In data.')
     # Confirm the required files are in place
     required_files = ['Not Logged In Report']
-    ad.confirm_files('Not Logged In Report', required_files)
+    confirm_files('Not Logged In Report', required_files)
     # Get name for Not Logged In Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Not_Logged_In_')
+    r_data, to_add, warnings_to_add = load_data('Not_Logged_In_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Student ID', 'Student', 'Tutor', 'Course', 'Last Access',
-                'Email']
-    r_data = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not an online course
-    r_data['Course'] = r_data['Course'].apply(list_non_on)
-    # Remove courses that are not Online ('Skip' in 'Course')
-    r_data = r_data.drop(r_data.index[r_data['Course'] == 'Skip'])
+    # Remove courses that are not Online courses
+    r_data = r_data[get_courses(r_data['Course'])[1] == 'ON']
     last_col = 'Last Access'
-    # Convert timestamps to dates (strings)
-    r_data[last_col] = r_data[last_col].apply(da.clean_date, args=('-','-',''))
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    r_data[last_col] = r_data[last_col].apply(da.replace_nil_date)
+    # Convert timestamps to dates (strings), 01-01-1970 becomes empty
+    r_data = r_data.assign(**{last_col: normalise_dates(r_data[last_col],
+                                                        '-')[1]})
     # Save Master file
     f_name = 'Not_Logged_In_ON_{}{}.xls'.format(period,
-                               ft.generate_time_string())
+                               get_time_string())
     r_data.to_excel(f_name, index=False)
     print('\nNot_Logged_In_ON_{} has been saved to {}'.format(period, f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_not_logged_in_pt(period):
@@ -3363,32 +2798,26 @@ def process_not_logged_in_pt(period):
     print('\nProcessing Not Logged In data.')
     # Confirm the required files are in place
     required_files = ['Not Logged In Report']
-    ad.confirm_files('Not Logged In Report', required_files)
+    confirm_files('Not Logged In Report', required_files)
     # Get name for Not Logged In Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Not_Logged_In_')
+    r_data, to_add, warnings_to_add = load_data('Not_Logged_In_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe with the data
-    headings = ['Student ID', 'Student', 'Tutor', 'Course', 'Last Access',
-                'Email']
-    r_data = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not a Part-time course
-    r_data['Course'] = r_data['Course'].apply(list_non_pt)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    r_data = r_data.drop(r_data.index[r_data['Course'] == 'Skip'])
+    # Remove courses that are not Part-time courses
+    r_data = r_data[get_courses(r_data['Course'])[1] == 'PT']
     last_col = 'Last Access'
-    # Convert timestamps to dates (strings)
-    r_data[last_col] = r_data[last_col].apply(da.clean_date, args=('-','-',''))
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    r_data[last_col] = r_data[last_col].apply(da.replace_nil_date)
+    # Convert timestamps to dates (strings), 01-01-1970 becomes empty
+    r_data = r_data.assign(**{last_col: normalise_dates(r_data[last_col],
+                                                        '-')[1]})
     # Save Master file
     f_name = 'Not_Logged_In_PT_{}{}.xls'.format(period,
-                               ft.generate_time_string())
+                               get_time_string())
     r_data.to_excel(f_name, index=False)
     print('\nNot_Logged_In_PT_{} has been saved to {}'.format(period, f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
     
 
 def process_not_submitted_on(period):
@@ -3426,55 +2855,38 @@ def process_not_submitted_on(period):
     # Confirm the required files are in place
     required_files = ['Submissions Made report', 'Student File',
                       'Active Students File']
-    ad.confirm_files('Not Submitted Report', required_files)
+    confirm_files('Not Submitted Report', required_files)
     # Get name for Submissions Made Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Submissions_Made_')
+    subs, to_add, warnings_to_add = load_data('Submissions_Made_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(subs)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Get the name for the Students File
-    student_data, to_add, warnings_to_add = load_data('Students_File_')
+    students, to_add, warnings_to_add = load_data('Students_File_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Get the name for the Active Students File
-    active_students, to_add, warnings_to_add = load_data(
+    active, to_add, warnings_to_add = load_data(
             'Active_Students_File_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe for Submissions Made report data
-    headings = ['Student ID', 'Student', 'Course', 'Tutor', 'Assignment name',
-                'Last submission date']
-    subs = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not an online course
-    subs['Course'] = subs['Course'].apply(list_non_on)
-    # Remove courses that are not Online ('Skip' in 'Course')
-    subs = subs.drop(subs.index[subs['Course'] == 'Skip'])
+    # Remove courses that are not Online courses
+    subs = subs[get_courses(subs['Course'])[1] == 'ON']
     # Clean the Last submission date
     last_col = 'Last submission date'
-    subs[last_col] = subs[last_col].apply(extract_last_submission_date)
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    subs[last_col] = subs[last_col].apply(da.replace_nil_date)
-    # Create a dataframe for the students in the course
-    headings = ['Course', 'Tutor', 'Student ID', 'Student']
-    students = pd.DataFrame(data = student_data, columns = headings)
-     # Change value in Course column to 'Skip' if not an Online course
-    students['Course'] = students['Course'].apply(list_non_on)
-    # Remove courses that are not Online ('Skip' in 'Course')
-    students = students.drop(students.index[students['Course'] == 'Skip'])
-    # Create a dataframe for active students
-    headings = ['Student ID', 'Student', 'Course']
-    active = pd.DataFrame(data = active_students, columns = headings)
-    # Change value in Course column to 'Skip' if not an Online course
-    active['Course'] = active['Course'].apply(list_non_on)
-    # Remove courses that are not Online ('Skip' in 'Course')
-    active = active.drop(active.index[active['Course'] == 'Skip'])
+    # Convert to DD-MM-YYYY, 01-01-1970 becomes empty
+    subs = subs.assign(**{last_col: normalise_dates(subs[last_col], '-')[1]})
+    # Remove courses that are not Online courses
+    students = students[get_courses(students['Course'])[1] == 'ON']
+    # Remove courses that are not Online courses
+    active = active[get_courses(active['Course'])[1] == 'ON']
     # Remove students that aren't active in the course from students dataframe
     active_students = []
     # Get the Student ID for each student in active
@@ -3494,10 +2906,11 @@ def process_not_submitted_on(period):
     non_sub_students =  non_sub_students.sort_values(['Tutor', 'Student ID'])
     # Save a master file ordered by Tutor and Student ID
     f_name = 'Not_Submitted_All_{}{}.xls'.format(period,
-                                ft.generate_time_string())
+                                get_time_string())
     non_sub_students.to_excel(f_name, index=False)
     print('\nNot_Submitted_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
     
 
 def process_not_submitted_pt(period):
@@ -3535,54 +2948,37 @@ def process_not_submitted_pt(period):
     # Confirm the required files are in place
     required_files = ['Submissions Made report', 'Student File',
                       'Active Students File']
-    ad.confirm_files('Not Submitted Report', required_files)
+    confirm_files('Not Submitted Report', required_files)
     # Get name for Submissions Made Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Submissions_Made_')
+    subs, to_add, warnings_to_add = load_data('Submissions_Made_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(subs)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Get the name for the Students File
-    student_data, to_add, warnings_to_add = load_data('Students_File_')
+    students, to_add, warnings_to_add = load_data('Students_File_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
     # Get the name for the Active Students File
-    active_students, to_add, warnings_to_add = load_data('Active_Students_File_')
+    active, to_add, warnings_to_add = load_data('Active_Students_File_')
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe for Submissions Made report data
-    headings = ['Student ID', 'Student', 'Course', 'Tutor', 'Assignment name',
-                'Last submission date']
-    subs = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not a Part-time course
-    subs['Course'] = subs['Course'].apply(list_non_pt)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    subs = subs.drop(subs.index[subs['Course'] == 'Skip'])
+    # Remove courses that are not Part-time courses
+    subs = subs[get_courses(subs['Course'])[1] == 'PT']
     # Clean the Last submission date
     last_col = 'Last submission date'
-    subs[last_col] = subs[last_col].apply(extract_last_submission_date)
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    subs[last_col] = subs[last_col].apply(da.replace_nil_date)
-    # Create a dataframe for the students in the course
-    headings = ['Course', 'Tutor', 'Student ID', 'Student']
-    students = pd.DataFrame(data = student_data, columns = headings)
-    # Change value in Course column to 'Skip' if not a Part-time course
-    students['Course'] = students['Course'].apply(list_non_pt)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    students = students.drop(students.index[students['Course'] == 'Skip'])
-    # Create a dataframe for active students
-    headings = ['Student ID', 'Student', 'Course']
-    active = pd.DataFrame(data = active_students, columns = headings)
-    # Change value in Course column to 'Skip' if not a Part-time course
-    active['Course'] = active['Course'].apply(list_non_pt)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    active = active.drop(active.index[active['Course'] == 'Skip'])
+    # Convert to DD-MM-YYYY, 01-01-1970 becomes empty
+    subs = subs.assign(**{last_col: normalise_dates(subs[last_col], '-')[1]})
+    # Remove courses that are not Part-time courses
+    students = students[get_courses(students['Course'])[1] == 'PT']
+    # Remove courses that are not Part-time courses
+    active = active[get_courses(active['Course'])[1] == 'PT']
     # Remove students that aren't active in the course from students dataframe
     active_students = []
     # Get the Student ID for each student in active
@@ -3602,10 +2998,11 @@ def process_not_submitted_pt(period):
     non_sub_students =  non_sub_students.sort_values(['Tutor', 'Student ID'])
     # Save a master file ordered by Tutor and Student ID
     f_name = 'Not_Submitted_All_{}{}.xls'.format(period,
-                                ft.generate_time_string())
+                                get_time_string())
     non_sub_students.to_excel(f_name, index=False)
     print('\nNot_Submitted_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_submissions_made_on(period):
@@ -3629,29 +3026,21 @@ def process_submissions_made_on(period):
     print('\nSubmissions Made data.')
     # Confirm the required files are in place
     required_files = ['Submissions Made report']
-    ad.confirm_files('Submissions Made Report', required_files)
+    confirm_files('Submissions Made Report', required_files)
     # Get name for Submissions Made Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Submissions_Made_')
+    subs, to_add, warnings_to_add = load_data('Submissions_Made_')
     # print('Check loaded data:')
-    # ad.debug_list(report_data)
+    # print(subs)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe for Submissions Made report data
-    headings = ['Student ID', 'Student', 'Course', 'Tutor', 'Assignment name',
-                'Last submission date']
-    subs = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not an online course
-    subs['Course'] = subs['Course'].apply(list_non_on)
-    # Remove courses that are not Online ('Skip' in 'Course')
-    subs = subs.drop(subs.index[subs['Course'] == 'Skip'])
+    # Remove courses that are not Online courses
+    subs = subs[get_courses(subs['Course'])[1] == 'ON']
     # Clean the Last submission date
     last_col = 'Last submission date'
-    # print(subs)
-    subs[last_col] = subs[last_col].apply(da.clean_date, args=('-','-',''))
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    subs[last_col] = subs[last_col].apply(da.replace_nil_date)
+    # Convert to DD-MM-YYYY, 01-01-1970 becomes empty
+    subs = subs.assign(**{last_col: normalise_dates(subs[last_col], '-')[1]})
     # Remove Assessment name column
     headings = ['Student ID', 'Student', 'Course', 'Tutor',
                 'Last submission date']
@@ -3659,10 +3048,11 @@ def process_submissions_made_on(period):
     # Sort by Last submission date
     subs =  subs.sort_values(['Tutor', 'Last submission date'])
     # Save a master file
-    f_name = 'Submitted_All_{}{}.xls'.format(period, ft.generate_time_string())
+    f_name = 'Submitted_All_{}{}.xls'.format(period, get_time_string())
     subs.to_excel(f_name, index=False)
     print('\nSubmitted_All_ has been saved to {}'.format(f_name))
-    ft.process_warning_log(warnings, warnings_to_process)
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
 
 
 def process_submissions_made_pt(period):
@@ -3686,27 +3076,20 @@ def process_submissions_made_pt(period):
     print('\nSubmissions Made data.')
     # Confirm the required files are in place
     required_files = ['Submissions Made report']
-    ad.confirm_files('Submissions Made Report', required_files)
+    confirm_files('Submissions Made Report', required_files)
     # Get name for Submissions Made Report data file and then load
-    report_data, to_add, warnings_to_add = load_data('Submissions_Made_')
-    # ad.debug_list(report_data)
+    subs, to_add, warnings_to_add = load_data('Submissions_Made_')
+    # print(subs)
     if to_add:
         warnings_to_process = True
         for line in warnings_to_add:
             warnings.append(line)
-    # Create a dataframe for Submissions Made report data
-    headings = ['Student ID', 'Student', 'Course', 'Tutor', 'Assignment name',
-                'Last submission date']
-    subs = pd.DataFrame(data = report_data, columns = headings)
-    # Change value in Course column to 'Skip' if not a Part-time course
-    subs['Course'] = subs['Course'].apply(list_non_pt)
-    # Remove courses that are not Part-time ('Skip' in 'Course')
-    subs = subs.drop(subs.index[subs['Course'] == 'Skip'])
+    # Remove courses that are not Part-time courses
+    subs = subs[get_courses(subs['Course'])[1] == 'PT']
     # Clean the Last submission date
     last_col = 'Last submission date'
-    subs[last_col] = subs[last_col].apply(da.clean_date, args=('-','-',''))
-    # Replace 01-01-1970 with an empty string in date column Last Submission
-    subs[last_col] = subs[last_col].apply(da.replace_nil_date)
+    # Convert to DD-MM-YYYY, 01-01-1970 becomes empty
+    subs = subs.assign(**{last_col: normalise_dates(subs[last_col], '-')[1]})
     # Remove Assessment name column
     headings = ['Student ID', 'Student', 'Course', 'Tutor',
                 'Last submission date']
@@ -3714,9 +3097,57 @@ def process_submissions_made_pt(period):
     # Sort by Last submission date
     subs =  subs.sort_values(['Tutor', 'Last submission date'])
     # Save a master file
-    f_name = 'Submitted_All_{}{}.xls'.format(period, ft.generate_time_string())
+    f_name = 'Submitted_All_{}{}.xls'.format(period, get_time_string())
     subs.to_excel(f_name, index=False)
     print('\nSubmitted_All_ has been saved to {}'.format(f_name))
+    print_date_stats()
+    process_warning_log(warnings, warnings_to_process)
+
+
+def process_tag_history():
+    """Prepare Tag History reports from the tag history store.
+    
+    Saves a report of the students that have regressed in at least 2 of the
+    last 3 changes in tag and a report of the number of each tag per tutor
+    for each of the last 12 Insightly Tags runs.
+    
+    File Source (Tag History):
+        Tag_History.db, added to by each Insightly Tags Updates run.
+    
+    Returns:
+        False if the reports could not be prepared, otherwise None.
+    """
+    print('\nProcessing Tag History data.')
+    if not os.path.exists(TAG_HISTORY_DB):
+        print('\n{} could not be found. Please run the Insightly Tags '
+              'Updates Report first.'.format(TAG_HISTORY_DB))
+        return False
+    # Students regressed in 2 of the last 3 changes
+    regressed = get_regressed_students()
+    f_name = 'Tag_History_Regressed_{}.xls'.format(get_time_string())
+    regressed.to_excel(f_name, index=False)
+    print('\nTag_History_Regressed_ has been saved to {}'.format(f_name))
+    # Tags per tutor for each run
+    trends = get_tutor_trends()
+    f_name = 'Tag_History_Trends_{}.xls'.format(get_time_string())
+    trends.to_excel(f_name, index=False)
+    print('\nTag_History_Trends_ has been saved to {}'.format(f_name))
+
+
+def process_warning_log(warnings, warnings_to_process):
+    """Process the warnings log for a report.
+    
+    When a batch job is run by run_job() the warnings are kept in BATCH
+    instead, so that they can be returned with the job's result and logged
+    by the main process.
+    
+    Args:
+        warnings (list): Heading followed by the report's warnings.
+        warnings_to_process (bool): True if there are warnings to log.
+    """
+    if BATCH['warnings'] is not None:
+        BATCH['warnings'].append((warnings, warnings_to_process))
+        return
     ft.process_warning_log(warnings, warnings_to_process)
 
 
@@ -3729,87 +3160,213 @@ def removal(raw_data):
     the data in a later step.
     
     Args:
-        raw_data (str): String containing Contact tag data.
+        raw_data (Series): Contact tag data for each student.
         
     Returns:
-        'Remove' if a tag  in the list for removal is found, the passed Tags
-        otherwise.
+        Series with 'Remove' where a tag in the list for removal is found, the
+        passed Tags otherwise.
     """
-    to_remove = ['withdrawn', 'graduated', 'expired', 'suspended', 'on hold',
-                 'cancelled', 'transferred']
-    for item in to_remove:
-        if re.search(item, raw_data.lower()):
-            return 'Remove'
-    else:
-        return raw_data
+    codes, uniques, matches = match_tags(raw_data)
+    remove = matches[matches.isin(RESERVED_TAGS)].index.unique()
+    return raw_data.where(~pd.Series(codes, index=raw_data.index).isin(remove),
+                          'Remove')
 
 
-def rename_tutor(tutor):
-    """Rename empty tutor in tags_count DataFrame.
+def rename_tutor(tutors):
+    """Rename empty tutors in tags_count DataFrame.
     
     Args:
-        tutor (str): Name of Tutor.
+        tutors (Series): Names of Tutors.
     
     Returns:
-        'Combined or Unknown' if Tutor name is blank.
+        'Combined or Unknown' in place of each blank Tutor name.
     """
-    if tutor in (None, ''):
-        return 'Combined or Unknown'
-    else:
-        return tutor
+    blank = tutors.isnull() | (tutors == '')
+    return tutors.where(~blank, 'Combined or Unknown')
 
 
-def replace_single_tutor_name(tutor_id, tutors, headings):
-    """Replace Tutor ID with Tutor Name.
+def replace_tutor_ids(tutor_ids, tutor_dict):
+    """Replace each Tutor ID in a column with the Tutor Name.
+    
+    Blank Tutor IDs are left blank. Tutor IDs that are not in tutor_dict are
+    left unchanged and returned so that they can be reported.
     
     Args:
-        tutor (str): Tutor ID.
-        tutors (DataFrame): TutorIDs.csv information. 
-        headings (list): tid_name, fname_name, lname_name.
+        tutor_ids (Series): Tutor IDs.
+        tutor_dict (dict): Tutor ID: Tutor name, from get_tutor_dict().
     
     Returns:
-        tutor_name (str): Name of Tutor.
+        tutor_names (Series): Tutor names in place of the Tutor IDs.
+        unknown (list): Tutor IDs that are not in tutor_dict.
     """
-    # Skip students without a tutor
-    if tutor_id in (None, ''):
-        return tutor_id
-    # Create a dictionary with Tutor ID's and Tutor
-    tutor_dict = {}
-    for index, row in tutors.iterrows():
-        # Create key value TutorID: First + Last Name
-        tutor_dict[row[headings[0]]] = '{} {}'.format(row[headings[1]],
-                  row[headings[2]])
-    updated_tutor = tutor_dict[tutor_id]
-    return updated_tutor
+    tutor_names = tutor_ids.map(tutor_dict)
+    missing = tutor_names.isnull()
+    tutor_names = tutor_names.where(~missing, tutor_ids)
+    blank = tutor_ids.isnull() | (tutor_ids == '')
+    unknown = tutor_ids[missing & ~blank].unique().tolist()
+    return tutor_names, unknown
 
 
-def replace_tutor_name(tutor_count, tutors, headings):
-    """Replace Tutor ID with Tutor Name.
+def run_batch(job_file, workers=None):
+    """Run the jobs in a job file without asking the user for anything.
+    
+    The job file is JSON with a list of jobs, each with the menu option to
+    run and the file to load for each source code it needs. Files given
+    outside the jobs are used by every job. The input files are loaded into
+    the input cache first and the jobs are then run in a pool of processes.
+    Each job's output and warnings log are processed, in job order, as it
+    finishes. Jobs of the options in BATCH_DEPENDENCIES are only started
+    once every job of the options they depend on has finished. A job without
+    a valid menu option is not run. A job that fails, or is not run, is
+    reported and the remaining jobs are still run. The time taken by each
+    job is printed at the end.
     
     Args:
-        tutor_count (list): Tutor count information with Tutor ID.
-        tutors (DataFrame): TutorIDs.csv information. 
-        headings (list): tid_name, fname_name, lname_name.
+        job_file (str): Name of the job file.
+        workers (int): (Optional) Number of jobs to run at once. Defaults to
+        the number of CPUs.
     
-    Returns:
-        updated_tutors (list): Data with Tutor names replacing Tutor IDs.
+    File Structure (job_file):
+        {"files": {source: file name, ...},
+         "jobs": [{"option": number, "files": {source: file name, ...}},
+                  ...]}
+    """
+    with open(job_file) as f:
+        batch = json.load(f)
+    menu = get_menu()
+    jobs = []
+    inputs = set()
+    for job in batch['jobs']:
+        option = job.get('option')
+        files = dict(batch.get('files', {}))
+        files.update(job.get('files', {}))
+        if not isinstance(option, int) or not 1 <= option <= len(menu):
+            print('\nJob {} will not be run: {} is not a menu option (1 - {})'
+                  .format(len(jobs) + 1, option, len(menu)))
+            jobs.append((option, None))
+            continue
+        jobs.append((option, files))
+        inputs.update(files.items())
+    valid_jobs = len([files for option, files in jobs if files is not None])
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, valid_jobs))
+    start = time.perf_counter()
+    preload_inputs(inputs)
+    print('\nRunning {} jobs, {} at a time'.format(valid_jobs, workers))
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = [None if files is None or option in BATCH_DEPENDENCIES
+                   else executor.submit(run_job, option, files, job)
+                   for job, (option, files) in enumerate(jobs, 1)]
+        for job, (option, files) in enumerate(jobs, 1):
+            if files is None or option not in BATCH_DEPENDENCIES:
+                continue
+            concurrent.futures.wait([
+                    future for (needed, _), future in zip(jobs, futures)
+                    if needed in BATCH_DEPENDENCIES[option] and future])
+            futures[job - 1] = executor.submit(run_job, option, files, job)
+        for (option, files), future in zip(jobs, futures):
+            if future is None:
+                results.append((option, 'Not a menu option', 0, 'Not run'))
+                continue
+            label = menu[option - 1][0]
+            try:
+                seconds, status, output, warning_logs = future.result()
+            except Exception as error:
+                seconds, output, warning_logs = 0, '', []
+                status = 'Failed ({})'.format(error)
+            print('\nRunning option {}: {}'.format(option, label))
+            print(output, end='')
+            for warnings, warnings_to_process in warning_logs:
+                ft.process_warning_log(warnings, warnings_to_process)
+            results.append((option, label, seconds, status))
+    print('\nBatch summary:\n')
+    for option, label, seconds, status in results:
+        print('{:>3} {:<50} {:>8.1f}s  {}'.format(str(option), label,
+                                                  seconds, status))
+    print('\nTotal time: {:.1f}s ({:.1f}s running the jobs)'.format(
+            time.perf_counter() - start, sum(result[2] for result in
+                                              results)))
+
+
+def run_job(option, files, job):
+    """Run one batch job and return its result.
+    
+    Run in a worker process by run_batch(). The job's printed output and
+    warnings logs are kept and returned rather than written, so that the jobs
+    running at the same time do not mix their output. The job number is added
+    to the names of the files the job saves (see get_time_string()). A job
+    fails if its function raises an error or returns False (a report that
+    could not be prepared), in which case the last line it printed is given
+    as the reason.
+    
+    Args:
+        option (int): Menu option to run.
+        files (dict): File name for each source code the job needs.
+        job (int): Number of the job in the job file.
+    
+    Returns:
+        seconds (float): Time taken by the job.
+        status (str): 'Done', or 'Failed' and the reason the job failed.
+        output (str): What the job printed.
+        warning_logs (list): (warnings, warnings_to_process) for each warnings
+        log of the job.
+    """
+    label, function, args = get_menu()[option - 1]
+    BATCH['running'] = True
+    BATCH['files'] = files
+    BATCH['warnings'] = []
+    BATCH['job'] = job
+    output = io.StringIO()
+    start = time.perf_counter()
+    clear_date_cache()
+    try:
+        with contextlib.redirect_stdout(output):
+            result = function(*args)
+        if result is False:
+            lines = output.getvalue().strip().splitlines()
+            status = 'Failed ({})'.format(lines[-1] if lines else
+                                          'report not prepared')
+        else:
+            status = 'Done'
+    except (Exception, SystemExit) as error:
+        status = 'Failed ({})'.format(error)
+    finally:
+        warning_logs = BATCH['warnings']
+        BATCH['running'] = False
+        BATCH['files'] = {}
+        BATCH['warnings'] = None
+        BATCH['job'] = None
+    return (time.perf_counter() - start, status, output.getvalue(),
+            warning_logs)
+
+
+def save_cached_data(cache_path, read_data, to_add, warnings):
+    """Save loaded data, and its warnings, to the input cache.
+    
+    The data is pickled, keeping its column types (e.g. categoricals) and
+    storing each value at its own length. The entry is written to a temporary
+    directory first so a partly written entry is never read. The least
+    recently used entries are then evicted if the cache is too large.
+    
+    Args:
+        cache_path (str): Directory for the file's cache entry.
+        read_data (DataFrame): The data read from the file.
+        to_add (bool): True if there are warnings for the data.
+        warnings (list): Warnings that have been identified in the data.
     """
-    updated_tutors = []
-    # Create a dictionary with Tutor ID's and Tutor
-    tutor_dict = {}
-    for index, row in tutors.iterrows():
-        # Create key value TutorID: First + Last Name
-        tutor_dict[row[headings[0]]] = '{} {}'.format(row[headings[1]],
-                  row[headings[2]])
-    # Update Tutor names in tutor_count
-    for tutor in tutor_count:
-        updated_tutor = []
-        updated_tutor.append(tutor_dict[tutor[0]])
-        updated_tutor.append(tutor[1])
-        updated_tutor.append(tutor[2])
-        updated_tutor.append(tutor[3])
-        updated_tutors.append(updated_tutor)
-    return updated_tutors
+    temp_path = '{}.tmp{}'.format(cache_path, os.getpid())
+    os.makedirs(temp_path, exist_ok=True)
+    read_data.to_pickle(os.path.join(temp_path, 'data.pkl'))
+    meta = {'to_add': to_add, 'warnings': warnings}
+    with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    try:
+        os.rename(temp_path, cache_path)
+    except OSError: # Already saved (e.g. by another batch job)
+        shutil.rmtree(temp_path, ignore_errors=True)
+    evict_input_cache()
 
 
 def save_tags_count(count_data, headings, f_name):
@@ -3832,6 +3389,25 @@ def save_tags_count(count_data, headings, f_name):
                 csvwriter.writerow([tutor, item, count_data[tutor][item]])
 
 
+def save_tag_history(tags_df, headings, run_date, db_name=TAG_HISTORY_DB):
+    """Append the Updated_Tags for a run to the tag history store.
+    
+    Args:
+        tags_df (DataFrame): Updated_Tags data for the run.
+        headings (list): sid_name, eid_name, stud_name, cid_name,
+        tutor_name, new_tags_name.
+        run_date (str): Date and time of the run ('YYYY-MM-DD hh:mm:ss').
+        db_name (str): (Optional) File name of the tag history store.
+    """
+    conn = connect_tag_history(db_name)
+    rows = ([run_date] + list(student) for student in
+            tags_df[headings].itertuples(index=False, name=None))
+    with conn:
+        conn.executemany('INSERT INTO tag_history VALUES (?, ?, ?, ?, ?, ?, '
+                         '?)', rows)
+    conn.close()
+
+
 def save_tutor_df(all_data, d_name, tut_col):
     """Save data for each tutor into separate csv files.
     
@@ -3847,7 +3423,7 @@ def save_tutor_df(all_data, d_name, tut_col):
         tutor_students = tutor_grp.get_group(tutor)
         tutor_name = '{}_'.format(tutor.replace(' ', '_'))
         f_name = '{}{}{}.xls'.format(d_name, tutor_name,
-                  ft.generate_time_string())
+                  get_time_string())
         tutor_students.to_excel(f_name, index = False)
         print('{} has been saved to {}'.format(tutor, f_name))
 
@@ -3855,8 +3431,9 @@ def save_tutor_df(all_data, d_name, tut_col):
 def tags_count(tags_data, headings):
     """Count number of tags per colour per tutor.
     
-    Returns a dictionary with each tutor and a count of each tag colour for
-    them. Skips tags that are not in the list of tags to include.
+    Returns a DataFrame with each tutor and a count of each tag colour for
+    them, followed by a Total row. Skips tags that are not in the list of tags
+    to include. Blank tutors are shown as 'Combined or Unknown'.
     
     Args:
         tags_data (DataFrame): Student Tags data
@@ -3864,47 +3441,33 @@ def tags_count(tags_data, headings):
         tutor_name, new_tags_name.
         
     Returns:
-        tags_count (dict): Dictionary with tag count be colour for each tutor.
+        tags_count (DataFrame): Tutor, Green, Orange, Red, Black, Purple.
     """
-    # Create a list of tutors from tags_data
-    tutors = tags_data[headings[4]].unique()
     tags = ['Green', 'Orange', 'Red', 'Black', 'Purple']
-    tags_count = {}
     print('\nCounting Tags per Colour')
-    # Create and populate dictionary to hold tags per tutor
-    for tutor in tutors:
-        tags_count[tutor] = {}
-        for tag in tags:
-            tags_count[tutor][tag] = 0
-    # Update dictionary by going through tags_data
-    num_students = len(tags_data.index) # For calculating % complete
-    n = 0
-    for index, row in tags_data.iterrows():
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        # Get tutor name
-        tutor = row[headings[4]]
-        # Get tag colour
-        tag = row[headings[5]]
-        # Update tag count
-        if tag in tags:
-            tags_count[tutor][tag] += 1
-    # ad.debug_dict(tags_count)    
-    # Return dictionary
+    # Count tags per tutor, keeping tutors in the order they appear
+    tutors = tags_data[headings[4]].fillna('')
+    tags_count = pd.crosstab(tutors, tags_data[headings[5]]).reindex(
+            index=tutors.unique(), columns=tags, fill_value=0)
+    tags_count.index.name = 'Tutor'
+    tags_count.columns.name = None
+    tags_count = tags_count.reset_index()
+    # Rename empty Tutor cell and add a Total row
+    tags_count['Tutor'] = rename_tutor(tags_count['Tutor'])
+    tags_count = add_total_row(tags_count, 'Tutor')
     print('\rFinished counting Tags per Colour')
-    return tags_count, tags
+    return tags_count
 
 
 def update_tags(tag_list):
     """Return student tags.
     
     Compares the student's tag to their tag zone and determines the correct
-    tag for the student. If the tag is Green it stays Green. For Orange, Red
-    and Black tags, the tag is not allowed to exceed the student's zone. E.g.
-    if a student is tagged Red but can only be in the Orange zone, their tag
-    will be set to Orange.
+    tag for the student. The tag is the higher of the student's tag and their
+    zone, so a tag cannot be lower than the zone allows. E.g. a student tagged
+    Red that is still in the Orange zone will be set to Orange, and any
+    student in the Green zone is Green. Tags that are in the reserved list are
+    kept as they are. Anything else without a colour tag or zone is Black.
     
     Args:
         tag_list(list): StudentID, tag_start and zone.
@@ -3912,38 +3475,83 @@ def update_tags(tag_list):
     Returns:
         updated_students (list): StudentID, Tag.
     """
-    updated_students = []
-    reserved = ['withdrawn', 'graduated', 'expired', 'suspended', 'on hold',
-                'cancelled', 'transferred']
     print('\nUpdating Student Tags')
-    num_students = len(tag_list) # For calculating % complete
-    n = 0
-    for student in tag_list:
-        updated_student = []
-        # Display progress
-        n += 1
-        progress = round((n/num_students) * 100)
-        print("\rProgress: {}{}".format(progress, '%'), end="", flush=True)
-        updated_student.append(student[0])
-        '''
-        print('Debugging: Student ID: {} Tag_Start: {} Zone: {}'.format
-              (student[0], student[1], student[2]))
-        '''
-        if student[1] in reserved:
-            tag = student[1]
-        elif student[1] == 'Green' or student[2] == 'Green':
-            tag = 'Green'
-        elif student[1] == 'Orange' or student[2] == 'Orange':
-            tag = 'Orange'
-        elif student[1] == 'Red' or student[2] == 'Red':
-            tag = 'Red'
-        else:
-            tag = 'Black'
-        updated_student.append(tag)
-        updated_students.append(updated_student)
+    students = pd.DataFrame(data=tag_list, columns=range(3))
+    # Take the higher of tag and zone, anything unknown becoming Black
+    codes = pd.concat([get_tag_codes(students[1]), get_tag_codes(students[2])],
+                      axis=1).max(axis=1).clip(lower=0)
+    tags = pd.Series(pd.Categorical.from_codes(codes, categories=TAG_ORDER,
+                                               ordered=True).astype(str),
+                     index=students.index)
+    reserved = students[1].isin(RESERVED_TAGS)
+    students[1] = students[1].where(reserved, tags)
+    updated_students = students[[0, 1]].values.tolist()
     print('\rFinished Updating Student Tags')
     return updated_students
 
 
+def validate_data(source, data):
+    """Return list of warnings for the data from a source.
+    
+    Checks that each required column for the source (see COLUMN_CHECKS) has
+    an entry in every row. Each column is checked as a whole and messages are
+    only made for the rows with a missing entry, in the order of the rows.
+    Missing entries that are errors are saved to the error log. Rows of the
+    Tutor IDs file without a Tutor ID are ignored and the other Tutor IDs must
+    be 6 characters long.
+    
+    Args:
+        source (str): The code for the table that the source data belongs to.
+        data (DataFrame): The data read from the file, empty cells as ''.
+    
+    Returns:
+        warnings (list): Heading followed by the warnings that have been
+        identified in the data, empty if there are none.
+    """
+    log_name, heading, checks = COLUMN_CHECKS[source]
+    # Row numbers and messages for the failing rows of each severity
+    found = {'error': ([], []), 'warning': ([], [])}
+    if source == 'Tutor_IDs_':
+        data = data[data['Tutor ID'] != '']
+        wrong_length = (data['Tutor ID'].str.strip().str.len() != 6).values
+        found['error'][0].append(np.flatnonzero(wrong_length))
+        found['error'][1].extend(
+                'Tutor ID number is not the required length for tutor in '
+                'position {} in the list.'.format(i) for i in
+                data.index[wrong_length])
+    for column, severity, key, message in checks:
+        missing = (data[column] == '').values
+        if missing.any():
+            rows, messages = found[severity]
+            rows.append(np.flatnonzero(missing))
+            messages.extend(message.format(value) for value in
+                            data[key].values[missing])
+    # Put each severity's messages in row order, checks in order within a row
+    for severity, (rows, messages) in found.items():
+        if messages:
+            order = np.argsort(np.concatenate(rows), kind='stable')
+            found[severity] = [messages[i] for i in order]
+        else:
+            found[severity] = []
+    # Check if any errors have been identified, save error log if they have
+    if len(found['error']) > 0:
+        ft.process_error_log(found['error'], log_name)
+    # Check if any warnings have been identified
+    if len(found['warning']) > 0:
+        return [heading] + found['warning']
+    else:
+        return []
+
+
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Prepare student reports.')
+    parser.add_argument('--batch', metavar='JOB_FILE',
+                        help='run the jobs in JOB_FILE without prompting')
+    parser.add_argument('--workers', type=int,
+                        help='number of batch jobs to run at once (default: '
+                        'number of CPUs)')
+    cl_args = parser.parse_args()
+    if cl_args.batch:
+        run_batch(cl_args.batch, cl_args.workers)
+    else:
+        main()